@@ -1,27 +1,104 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Request, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge
 import os
 import tempfile
-import pandas as pd
-import re
-from keyword_count_func import keyword_count, normalize_keyword
+from collections import Counter
+from keyword_count_func import keyword_count
 from keyword_similar_func import keyword_similar_merge
-from keyword_extraction_func import keyword_extraction
-from workcloud_func import workcloud
-from table_matcher_func import table_matcher
-from simple_tagcount_module import extract_tags
-from test_calculation_module import calculate_hours
+from keyword_extraction_func import keyword_extraction, company_wordcloud, ARTIFACT_PATTERN
+from workcloud_func import workcloud, render_workcloud, default_out_dir
+from company_store_func import ingest, query_counts, store_stats
+from tag_index_func import create_tag_index, match_tables
+from job_queue_func import submit_job, read_status, cancel_job, job_path, result_path
+from simple_tagcount_module import extract_tags, count_tags, tag_count
+from timeformattransfer_func import timeformattransfer, DEFAULT_TARGET_FORMAT
+from time_calculator_func import advanced_time_calculator
+from fuzzy_match_func import fuzzy_match
+from calculate_hours_func import calculate_hours, iter_calculate_hours, parse_time
+from file_loader_func import cache_stats, source_size
+from response_func import dataframe_response, cached_dataframe_response, chunked_dataframe_response
+from result_cache_func import result_key, result_cache_stats
+import file_loader_func, fuzzy_match_func, keyword_count_func, keyword_similar_func, similarity_func, simple_tagcount_module, table_matcher_func, tag_index_func
 # 其他模組依需求引入
 
+# 上傳大小上限（MB），超過時在讀取內容前即回傳 413
+UPLOAD_MAX_MB = float(os.environ.get('UPLOAD_MAX_MB', 200))
+# 小於此大小（MB）的上傳保留在記憶體，超過才寫入匿名暫存檔
+UPLOAD_SPOOL_MB = float(os.environ.get('UPLOAD_SPOOL_MB', 16))
+
+class SpooledRequest(Request):
+    """上傳檔案以 SpooledTemporaryFile 暫存，請求結束關閉時自動釋放"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=int(UPLOAD_SPOOL_MB * 1024 * 1024), mode='rb+')
+
+    # 回應內容串流讀取上傳檔時設為 True，上傳檔延到回應結束才關閉
+    keep_files = False
+
+    def close(self):
+        if not self.keep_files:
+            super().close()
+
+def streaming_upload_response(response):
+    """回應內容在端點返回後才逐塊讀取上傳檔：請求結束時不關閉上傳檔，改於回應結束時關閉"""
+    req = request._get_current_object()
+    req.keep_files = True
+
+    @response.call_on_close
+    def close_uploads():
+        req.keep_files = False
+        req.close()
+    return response
+
 app = Flask(__name__, static_folder='static', static_url_path='')
+app.request_class = SpooledRequest
+app.config['MAX_CONTENT_LENGTH'] = int(UPLOAD_MAX_MB * 1024 * 1024)
 CORS(app)
 
+@app.before_request
+def parse_uploads():
+    # 在進入各端點前解析上傳內容，超過大小上限的請求不會進到端點的例外處理
+    if request.content_type and request.content_type.startswith('multipart/form-data'):
+        request.files
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({'error': f'上傳檔案超過大小上限（{UPLOAD_MAX_MB:g} MB）'}), 413
+
+# 超過此大小的檔案改用串流模式計數（MB）
+KEYWORD_COUNT_STREAM_MB = float(os.environ.get('KEYWORD_COUNT_STREAM_MB', 50))
+KEYWORD_COUNT_CHUNKSIZE = int(os.environ.get('KEYWORD_COUNT_CHUNKSIZE', 50000))
+
+def keyword_count_chunksize(file_path):
+    if file_path and source_size(file_path) > KEYWORD_COUNT_STREAM_MB * 1024 * 1024:
+        return KEYWORD_COUNT_CHUNKSIZE
+    return None
+
+# 結果快取：各端點計算結果所依賴的模組，原始碼變更時快取失效
+RESULT_MODULES = {
+    'keyword_count': (keyword_count_func, file_loader_func),
+    'keyword_similar_merge': (keyword_similar_func, similarity_func, file_loader_func),
+    'table_matcher': (table_matcher_func, tag_index_func, similarity_func, file_loader_func),
+    'fuzzy_match': (fuzzy_match_func, similarity_func, file_loader_func),
+    'extract_tags': (simple_tagcount_module, file_loader_func),
+}
+
+def cache_key(endpoint, sources, params):
+    # workers 只影響平行度，不影響結果
+    return result_key(endpoint, sources, {k: v for k, v in params.items() if k != 'workers'},
+                      RESULT_MODULES[endpoint])
+
 @app.route('/')
 def serve_index():
     return send_from_directory(app.static_folder, 'index.html')
 
 @app.route('/static/<path:filename>')
 def serve_static(filename):
+    if ARTIFACT_PATTERN.fullmatch(filename):
+        # 以內容雜湊命名的輸出檔內容不會改變，可長期快取
+        response = send_from_directory('static', filename, max_age=365 * 24 * 3600)
+        response.cache_control.immutable = True
+        return response
     return send_from_directory('static', filename)
 
 # 關鍵字計數
@@ -32,39 +109,38 @@ def api_keyword_count():
             file = request.files['file']
             column_name = request.form.get('column_name')
             keywords = set(request.form.get('keywords', '').split(','))
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                result_df = keyword_count(tmp.name, column_name, keywords)
-            return jsonify(result_df.to_dict(orient='records'))
         else:
             data = request.get_json()
-            file_path = data.get('file_path')
+            file = data.get('file_path')
             column_name = data.get('column_name')
             keywords = set(data.get('keywords', []))
-            result_df = keyword_count(file_path, column_name, keywords)
-            return jsonify(result_df.to_dict(orient='records'))
+        key = cache_key('keyword_count', [file], {'column_name': column_name, 'keywords': sorted(keywords)})
+        return cached_dataframe_response(
+            key, lambda: keyword_count(file, column_name, keywords, chunksize=keyword_count_chunksize(file)))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # 相似公司名稱合併
+def keyword_similar_merge_params(source):
+    workers = source.get('workers')
+    return {
+        'threshold': float(source.get('threshold', 0.9)),
+        'mode': source.get('mode', 'greedy'),
+        'workers': int(workers) if workers not in (None, '') else None,
+    }
+
 @app.route('/api/keyword_similar_merge', methods=['POST'])
 def api_keyword_similar_merge():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file = request.files['file']
-            threshold = float(request.form.get('threshold', 0.9))
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                result_df = keyword_similar_merge(tmp.name, threshold=threshold)
-            return jsonify(result_df.to_dict(orient='records'))
+            params = keyword_similar_merge_params(request.form)
         else:
             data = request.get_json()
-            file_path = data.get('file_path')
-            threshold = float(data.get('threshold', 0.9))
-            result_df = keyword_similar_merge(file_path, threshold=threshold)
-            return jsonify(result_df.to_dict(orient='records'))
+            file = data.get('file_path')
+            params = keyword_similar_merge_params(data)
+        key = cache_key('keyword_similar_merge', [file], params)
+        return cached_dataframe_response(key, lambda: keyword_similar_merge(file, **params))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -74,16 +150,13 @@ def api_keyword_extraction():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file = request.files['file']
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                df, img_path = keyword_extraction(tmp.name)
-            return jsonify({'data': df.to_dict(orient='records'), 'wordcloud_img': img_path})
+            df, img_path = keyword_extraction(file, output_format=request.form.get('output_format', 'png'))
+            return dataframe_response({'data': df, 'wordcloud_img': img_path}, primary='data')
         else:
             data = request.get_json()
             file_path = data.get('file_path')
-            df, img_path = keyword_extraction(file_path)
-            return jsonify({'data': df.to_dict(orient='records'), 'wordcloud_img': img_path})
+            df, img_path = keyword_extraction(file_path, output_format=data.get('output_format', 'png'))
+            return dataframe_response({'data': df, 'wordcloud_img': img_path}, primary='data')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -93,47 +166,161 @@ def api_workcloud():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file = request.files['file']
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                wc_path, pie_path = workcloud(tmp.name)
+            wc_path, pie_path = workcloud(file, output_format=request.form.get('output_format', 'png'))
             return jsonify({'wordcloud_img': wc_path, 'pie_img': pie_path})
         else:
             data = request.get_json()
             file_path = data.get('file_path')
-            wc_path, pie_path = workcloud(file_path)
+            wc_path, pie_path = workcloud(file_path, output_format=data.get('output_format', 'png'))
             return jsonify({'wordcloud_img': wc_path, 'pie_img': pie_path})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# 公司統計彙總：匯入新資料（已匯入過的列依去重鍵略過）
+@app.route('/api/company_store/ingest', methods=['POST'])
+def api_company_store_ingest():
+    try:
+        if request.content_type and request.content_type.startswith('multipart/form-data'):
+            file = request.files['file']
+            source = request.form
+            key_columns = [c for c in source.get('key_columns', '').split(',') if c]
+        else:
+            source = request.get_json()
+            file = source.get('file_path')
+            key_columns = source.get('key_columns') or []
+        summary = ingest(file, mode=source.get('mode', 'subject'), key_columns=key_columns,
+                         date_column=source.get('date_column') or None)
+        return jsonify(summary)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def company_store_counts():
+    return query_counts(request.args.get('start'), request.args.get('end'))
+
+# 公司統計彙總：查詢任意日期範圍的公司次數，不需重新讀取原始檔
+@app.route('/api/company_store/counts', methods=['GET'])
+def api_company_store_counts():
+    try:
+        top = request.args.get('top')
+        df = query_counts(request.args.get('start'), request.args.get('end'),
+                          group_by=request.args.get('group_by') or None, top=int(top) if top else None)
+        return dataframe_response(df)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 公司統計彙總：以彙總結果繪製詞雲（同 keyword_extraction 的輸出）
+@app.route('/api/company_store/keyword_extraction', methods=['GET'])
+def api_company_store_keyword_extraction():
+    try:
+        df = company_store_counts()
+        df, img_path = company_wordcloud(Counter(dict(zip(df['company'], df['count']))),
+                                         output_format=request.args.get('output_format', 'png'))
+        return dataframe_response({'data': df, 'wordcloud_img': img_path}, primary='data')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 公司統計彙總：以彙總結果繪製詞雲與圓餅圖（同 workcloud 的輸出）
+@app.route('/api/company_store/workcloud', methods=['GET'])
+def api_company_store_workcloud():
+    try:
+        wc_path, pie_path = render_workcloud(company_store_counts(), default_out_dir(),
+                                             output_format=request.args.get('output_format', 'png'))
+        return jsonify({'wordcloud_img': wc_path, 'pie_img': pie_path})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/company_store', methods=['GET'])
+def api_company_store():
+    return jsonify(store_stats())
+
 # 表格智能匹配
+def table_matcher_params(source):
+    params = {
+        'main_field1': source.get('main_field1'),
+        'main_field2': source.get('main_field2'),
+        'tag_field1': source.get('tag_field1'),
+        'tag_field2': source.get('tag_field2'),
+        'tag_name_field': source.get('tag_name_field'),
+        'tag_value_field': source.get('tag_value_field'),
+    }
+    for key, cast in (('similarity_threshold', float), ('max_matches', int), ('min_similarity', float),
+                      ('workers', int)):
+        if source.get(key) is not None:
+            params[key] = cast(source.get(key))
+    if source.get('top_k') is not None:
+        top_k = source.get('top_k')
+        params['top_k'] = None if top_k in ('', 'none', 'None') else int(top_k)
+    return params
+
+def table_matcher_response(main_path, tag_path, tag_index_id, params):
+    def compute():
+        result_df, unmatched_df = match_tables(main_path, tag_path, tag_index_id, params)
+        return {'result': result_df, 'unmatched': unmatched_df}
+    key = cache_key('table_matcher', [main_path, None if tag_index_id else tag_path],
+                    dict(params, tag_index_id=tag_index_id))
+    return cached_dataframe_response(key, compute, primary='result')
+
 @app.route('/api/table_matcher', methods=['POST'])
 def api_table_matcher():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             main_file = request.files['main_file']
+            tag_file = request.files.get('tag_file')
+            tag_index_id = request.form.get('tag_index_id')
+            params = table_matcher_params(request.form)
+            if tag_index_id:
+                return table_matcher_response(main_file, None, tag_index_id, params)
+            return table_matcher_response(main_file, tag_file, None, params)
+        else:
+            data = request.get_json()
+            return table_matcher_response(data.get('main_file_path'), data.get('tag_file_path'),
+                                          data.get('tag_index_id'), table_matcher_params(data))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 建立可重複使用的標籤索引
+@app.route('/api/tag_index', methods=['POST'])
+def api_tag_index():
+    try:
+        if request.content_type and request.content_type.startswith('multipart/form-data'):
             tag_file = request.files['tag_file']
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(main_file.filename)[1]) as tmp_main, \
-                 tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(tag_file.filename)[1]) as tmp_tag:
-                main_file.save(tmp_main.name)
-                tag_file.save(tmp_tag.name)
-                result = table_matcher(tmp_main.name, tmp_tag.name)
-            return jsonify(result)
+            tag_field1 = request.form.get('tag_field1')
+            tag_field2 = request.form.get('tag_field2')
+            index_id = create_tag_index(tag_file, tag_field1, tag_field2)
         else:
             data = request.get_json()
-            result = table_matcher(**data)
-            return jsonify(result)
+            index_id = create_tag_index(data.get('tag_file_path'), data.get('tag_field1'), data.get('tag_field2'))
+        return jsonify({'tag_index_id': index_id})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # 標籤統計
+def extract_tags_params(source):
+    top_n = source.get('top_n')
+    return {
+        'top_n': int(top_n) if top_n not in (None, '') else None,
+        'samples': int(source.get('samples') or 0),
+    }
+
 @app.route('/api/extract_tags', methods=['POST'])
 def api_extract_tags():
     try:
-        data = request.get_json()
-        text = data.get('text', '')
-        tags = extract_tags(text)
-        return jsonify({'tags': tags})
+        if request.content_type and request.content_type.startswith('multipart/form-data'):
+            file = request.files['file']
+            column_name = request.form.get('column_name')
+            params = extract_tags_params(request.form)
+        else:
+            data = request.get_json()
+            if data.get('texts') is not None:
+                # 批次模式：多筆文字一次統計
+                return dataframe_response(count_tags(data['texts'], **extract_tags_params(data)))
+            if not data.get('file_path'):
+                return jsonify({'tags': extract_tags(data.get('text', ''))})
+            file = data['file_path']
+            column_name = data.get('column_name')
+            params = extract_tags_params(data)
+        key = cache_key('extract_tags', [file], dict(params, column_name=column_name))
+        return cached_dataframe_response(key, lambda: tag_count(file, column_name, **params))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -143,14 +330,16 @@ def api_calculate_hours():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file = request.files['file']
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                result = calculate_hours(tmp.name)
-            return jsonify(result)
+            # 逐塊計算並輸出，不保留整份結果
+            return streaming_upload_response(chunked_dataframe_response(
+                iter_calculate_hours(file, request.form.get('start_col'), request.form.get('end_col'))))
         else:
             data = request.get_json()
-            result = calculate_hours(**data)
+            if data.get('file_path'):
+                return chunked_dataframe_response(
+                    iter_calculate_hours(data['file_path'], data.get('start_col'), data.get('end_col')))
+            # 單筆計算：{"start_time": "...", "end_time": "..."}
+            result = calculate_hours(parse_time(data.get('start_time')), parse_time(data.get('end_time')))
             return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -161,62 +350,169 @@ def api_timeformattransfer():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file = request.files['file']
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                from timeformattransfer_module import timeformattransfer
-                result = timeformattransfer(tmp.name)
-            return jsonify(result)
+            source = request.form
+            columns = [c for c in source.get('columns', '').split(',') if c] or None
         else:
-            data = request.get_json()
-            from timeformattransfer_module import timeformattransfer
-            result = timeformattransfer(**data)
-            return jsonify(result)
+            source = request.get_json()
+            file = source.get('file_path')
+            columns = source.get('columns') or None
+        df, summary = timeformattransfer(file, columns, source.get('target_format') or DEFAULT_TARGET_FORMAT)
+        return dataframe_response({'data': df, 'columns': summary}, primary='data')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # 進階工時計算
+def list_param(value):
+    # 表單以逗號分隔，JSON 可直接給陣列
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    return list(value or [])
+
+def advanced_time_params(source):
+    params = {
+        'start_col': source.get('start_col'),
+        'end_col': source.get('end_col'),
+        'holidays': list_param(source.get('holidays')),
+        'group_by': list_param(source.get('group_by')) or None,
+        'detail': str(source.get('detail', 'true')).lower() not in ('false', '0', 'no'),
+    }
+    for name in ('source_tz', 'target_tz', 'workday_start', 'workday_end', 'weekmask'):
+        if source.get(name):
+            params[name] = source.get(name)
+    return params
+
 @app.route('/api/advanced_time_calculator', methods=['POST'])
 def api_advanced_time_calculator():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file = request.files['file']
-            filename = file.filename
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                file.save(tmp.name)
-                from test_calculation_module import advanced_time_calculator
-                result = advanced_time_calculator(tmp.name)
-            return jsonify(result)
+            params = advanced_time_params(request.form)
         else:
             data = request.get_json()
-            from test_calculation_module import advanced_time_calculator
-            result = advanced_time_calculator(**data)
-            return jsonify(result)
+            file = data.get('file_path')
+            params = advanced_time_params(data)
+        df, summary = advanced_time_calculator(file, **params)
+        payload = {}
+        if df is not None:
+            payload['data'] = df
+        if summary is not None:
+            payload['summary'] = summary
+        return dataframe_response(payload, primary='data' if df is not None else 'summary')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # 表格模糊匹配
+def fuzzy_match_params(source):
+    params = {
+        'key_a': list_param(source.get('key_a')) or None,
+        'key_b': list_param(source.get('key_b')) or None,
+    }
+    if source.get('scorer'):
+        params['scorer'] = source.get('scorer')
+    for key, cast in (('cutoff', float), ('top_k', int), ('workers', int)):
+        if source.get(key) not in (None, ''):
+            params[key] = cast(source.get(key))
+    return params
+
 @app.route('/api/fuzzy_match', methods=['POST'])
 def api_fuzzy_match():
     try:
         if request.content_type and request.content_type.startswith('multipart/form-data'):
             file_a = request.files['file_a']
             file_b = request.files['file_b']
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_a.filename)[1]) as tmp_a, \
-                 tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_b.filename)[1]) as tmp_b:
-                file_a.save(tmp_a.name)
-                file_b.save(tmp_b.name)
-                from table_matcher_func import fuzzy_match
-                result = fuzzy_match(tmp_a.name, tmp_b.name)
-            return jsonify(result)
+            params = fuzzy_match_params(request.form)
         else:
             data = request.get_json()
-            from table_matcher_func import fuzzy_match
-            result = fuzzy_match(**data)
-            return jsonify(result)
+            file_a = data.get('file_a_path')
+            file_b = data.get('file_b_path')
+            params = fuzzy_match_params(data)
+        def compute():
+            matched, unmatched_a, unmatched_b = fuzzy_match(file_a, file_b, **params)
+            return {'matched': matched, 'unmatched_a': unmatched_a, 'unmatched_b': unmatched_b}
+        return cached_dataframe_response(cache_key('fuzzy_match', [file_a, file_b], params), compute,
+                                         primary='matched')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# 背景工作：各類型的輸入檔案欄位與參數解析
+JOB_SPECS = {
+    'keyword_similar_merge': (('file',), keyword_similar_merge_params),
+    'workcloud': (('file',), lambda source: {'output_format': source.get('output_format', 'png')}),
+    'table_matcher': (('main_file', 'tag_file'),
+                      lambda source: dict(table_matcher_params(source), tag_index_id=source.get('tag_index_id'))),
+}
+
+@app.route('/api/jobs/<job_type>', methods=['POST'])
+def api_submit_job(job_type):
+    try:
+        if job_type not in JOB_SPECS:
+            return jsonify({'error': f'不支援的工作類型：{job_type}'}), 404
+        file_fields, params_func = JOB_SPECS[job_type]
+        if request.content_type and request.content_type.startswith('multipart/form-data'):
+            inputs = {name: request.files.get(name) for name in file_fields}
+            params = params_func(request.form)
+        else:
+            data = request.get_json()
+            # JSON 請求以伺服器上的檔案路徑指定輸入，欄位名稱為 <檔案欄位>_path
+            inputs = {name: data.get(f'{name}_path') for name in file_fields}
+            params = params_func(data)
+        job_id = submit_job(job_type, inputs, params)
+        return jsonify(read_status(job_id)), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    try:
+        status = read_status(job_id)
+        if status is None:
+            return jsonify({'error': f'找不到工作：{job_id}'}), 404
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def api_job_result(job_id):
+    try:
+        status = read_status(job_id)
+        if status is None:
+            return jsonify({'error': f'找不到工作：{job_id}'}), 404
+        if status.get('state') != 'done':
+            return jsonify(status), 409
+        return send_file(result_path(job_id), mimetype='application/json')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>/files/<path:filename>', methods=['GET'])
+def api_job_file(job_id, filename):
+    try:
+        return send_from_directory(job_path(job_id), filename)
+    except (ValueError, NotFound):
+        # 無效的工作ID或檔案不存在
+        return jsonify({'error': f'找不到檔案：{job_id}/{filename}'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def api_cancel_job(job_id):
+    try:
+        status = cancel_job(job_id)
+        if status is None:
+            return jsonify({'error': f'找不到工作：{job_id}'}), 404
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 檔案解析快取統計
+@app.route('/api/loader_cache', methods=['GET'])
+def api_loader_cache():
+    return jsonify(cache_stats())
+
+# 結果快取統計
+@app.route('/api/result_cache', methods=['GET'])
+def api_result_cache():
+    return jsonify(result_cache_stats())
+
 # 其他功能依此模式擴充
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""
+批次工時計算效能比較：逐列 iterrows + calculate_hours 與整欄向量化計算
+使用方式: python benchmarks/bench_calculate_hours.py [列數]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from calculate_hours_func import batch_calculate_hours, calculate_hours, parse_time
+
+def make_csv(path, rows):
+    rng = random.Random(0)
+    base = pd.Timestamp('2024-01-01').value // 10**9
+    starts, ends = [], []
+    for _ in range(rows):
+        start = base + rng.randint(0, 365 * 86400)
+        end = start + rng.choice([rng.randint(-3600, 12 * 3600), rng.randint(0, 5) * 86400])
+        starts.append(pd.Timestamp(start, unit='s').strftime('%Y-%m-%d %H:%M:%S'))
+        # 混入空值與無法解析的值
+        ends.append(rng.choice(['', 'N/A']) if rng.random() < 0.02 else pd.Timestamp(end, unit='s').strftime('%Y/%m/%d %H:%M'))
+    pd.DataFrame({'工單': range(rows), '開始時間': starts, '結束時間': ends}).to_csv(path, index=False)
+
+def per_row(path):
+    # 原 TimeBatchCalculatorApp.batch_calculate 的做法
+    df = pd.read_csv(path)
+    df['計算工時'] = [
+        calculate_hours(parse_time(row['開始時間']), parse_time(row['結束時間']))
+        for _, row in df.iterrows()
+    ]
+    return df
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    path = os.path.join(tempfile.mkdtemp(), 'hours.csv')
+    make_csv(path, rows)
+    print(f"rows={rows}")
+    print(f"{'mode':>24} {'time(s)':>8} {'rows/s':>10}")
+    results = {}
+    for name, func in (('iterrows (per row)', per_row),
+                       ('vectorized', lambda p: batch_calculate_hours(p, '開始時間', '結束時間')),
+                       ('vectorized, 5000/chunk', lambda p: batch_calculate_hours(p, '開始時間', '結束時間', chunksize=5000))):
+        t0 = time.perf_counter()
+        results[name] = func(path)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>24} {elapsed:>8.2f} {rows / elapsed:>10.0f}")
+    # 逐列結果指派到欄位時 None 會變成 NaN，統一轉為 float 比較
+    expected = results['iterrows (per row)']['計算工時'].astype(float)
+    for name, df in results.items():
+        pd.testing.assert_series_equal(df['計算工時'].astype(float), expected, check_names=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+公司名稱提取效能比較：Series.apply(extract_company) 與唯一值 + findall/explode 向量化
+使用方式: python benchmarks/bench_extract_company.py [列數] [不重複主旨數]
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from keyword_extraction_func import EXCLUSION_LIST, extract_companies, extract_company
+
+def make_subjects(rows, distinct, rng):
+    companies = [f'客戶{i}' for i in range(2000)]
+    pool = []
+    for i in range(distinct):
+        tags = [f'[{rng.choice(EXCLUSION_LIST)}]' for _ in range(rng.randint(0, 2))]
+        tags.insert(rng.randint(0, len(tags)), f'[{rng.choice(companies)}]')
+        pool.append(''.join(tags) + f' 工單{i} 系統異常')
+    # 混入空白主旨
+    return pd.Series([None if rng.random() < 0.02 else rng.choice(pool) for _ in range(rows)])
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    rng = random.Random(0)
+    print(f"rows={rows}")
+    print(f"{'distinct':>9} {'apply(s)':>9} {'vector(s)':>10} {'speedup':>8}")
+    for n in (distinct // 10, distinct, rows):
+        subjects = make_subjects(rows, n, rng).astype(str)
+        t0 = time.perf_counter()
+        # 空白主旨沒有公司名稱
+        expected = subjects.apply(lambda v: extract_company(v) if isinstance(v, str) else None)
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = extract_companies(subjects)
+        t_new = time.perf_counter() - t0
+        assert expected.fillna('').tolist() == got.fillna('').tolist()
+        assert got[subjects.isna()].isna().all()
+        print(f"{n:>9} {t_old:>9.2f} {t_new:>10.2f} {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
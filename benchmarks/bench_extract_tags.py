@@ -0,0 +1,46 @@
+"""
+標籤統計效能比較：每列一次 /api/extract_tags 請求後在用戶端計數 與 一次批次請求由伺服器彙總
+使用方式: python benchmarks/bench_extract_tags.py [列數]
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from app import app
+
+TAGS = ['急件', 'VIP', '退貨', '客訴', '已結案', '待確認']
+
+def make_texts(rows):
+    rng = random.Random(0)
+    return [' '.join(f'[{rng.choice(TAGS)}]' if rng.random() < 0.4 else '備註' for _ in range(rng.randint(0, 6)))
+            for _ in range(rows)]
+
+def per_row(client, texts):
+    counts = Counter()
+    for text in texts:
+        counts.update(client.post('/api/extract_tags', json={'text': text}).get_json()['tags'])
+    return sorted(counts.items(), key=lambda x: x[1], reverse=True)
+
+def batch(client, texts):
+    records = client.post('/api/extract_tags', json={'texts': texts}).get_json()
+    return [(r['標籤'], r['數量']) for r in records]
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    texts = make_texts(rows)
+    client = app.test_client()
+    print(f"rows={rows}")
+    print(f"{'mode':>22} {'requests':>9} {'time(s)':>8} {'rows/s':>10}")
+    results = {}
+    for name, func, requests in (('one request per row', per_row, rows), ('one batch request', batch, 1)):
+        t0 = time.perf_counter()
+        results[name] = func(client, texts)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>22} {requests:>9} {elapsed:>8.2f} {rows / elapsed:>10.0f}")
+    assert results['one batch request'] == results['one request per row']
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+關鍵字計數效能比較：逐關鍵字 str.contains 與 Aho-Corasick 單次掃描
+使用方式: python benchmarks/bench_keyword_count.py [列數]
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from keyword_count_func import count_keywords, normalize_keyword, build_keyword_automaton
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789測試客戶系統帳號權限報表匯出登入異常'
+
+def random_word(rng, lo=3, hi=8):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(lo, hi)))
+
+def old_count(text_series, keywords):
+    return {kw: text_series.str.contains(kw, regex=False).sum() for kw in keywords}
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    # 模擬工單主旨：一部分重複、一部分隨機
+    pool = [' '.join(random_word(rng) for _ in range(6)) for _ in range(rows // 5)]
+    texts = pd.Series([rng.choice(pool) for _ in range(rows)])
+    text_series = texts.astype(str).str.upper().str.replace(" ", "")
+    print(f"rows={rows}")
+    print(f"{'keywords':>9} {'old(s)':>9} {'new(s)':>9} {'speedup':>8}")
+    for n_kw in (10, 50, 100, 200, 500):
+        keywords = [normalize_keyword(random_word(rng, 2, 4)) for _ in range(n_kw)]
+        build_keyword_automaton.cache_clear()
+        t0 = time.perf_counter()
+        expected = old_count(text_series, keywords)
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        got = count_keywords(text_series, keywords)
+        t_new = time.perf_counter() - t0
+        assert {k: int(v) for k, v in expected.items()} == got
+        print(f"{n_kw:>9} {t_old:>9.3f} {t_new:>9.3f} {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+回應序列化效能比較：jsonify(to_dict('records')) 與逐塊串流輸出
+記錄總時間、第一個位元組的時間（TTFB）與 tracemalloc 峰值記憶體
+使用方式: python benchmarks/bench_serialization.py [最大列數]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from flask import Flask, jsonify
+from response_func import iter_csv, iter_json, iter_ndjson
+
+def make_frame(rows):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'company': [f'公司{i % 5000}股份有限公司' for i in range(rows)],
+        'count': rng.integers(0, 1000, rows),
+        'similarity': rng.random(rows),
+        'tags': [', '.join(f'標籤{j}' for j in range(i % 4)) for i in range(rows)],
+    })
+
+def measure(produce):
+    """produce() 回傳字串片段的迭代器；量測 TTFB、總時間與峰值記憶體"""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    parts = produce()
+    ttfb = None
+    size = 0
+    for part in parts:
+        if ttfb is None:
+            ttfb = time.perf_counter() - t0
+        size += len(part)
+    total = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, total, peak / 1e6, size
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    app = Flask(__name__)
+    print(f"{'rows':>8} {'format':>16} {'ttfb(s)':>8} {'total(s)':>9} {'peak(MB)':>9}")
+    rows = 25_000
+    while rows <= max_rows:
+        df = make_frame(rows)
+        with app.app_context():
+            cases = [
+                ('jsonify', lambda: iter([jsonify(df.to_dict(orient='records')).get_data()])),
+                ('json records', lambda: iter_json(df)),
+                ('json columns', lambda: iter_json(df, 'columns')),
+                ('ndjson', lambda: iter_ndjson(df)),
+                ('csv', lambda: iter_csv(df)),
+            ]
+            for name, produce in cases:
+                ttfb, total, peak, _ = measure(produce)
+                print(f"{rows:>8} {name:>16} {ttfb:>8.3f} {total:>9.3f} {peak:>9.1f}")
+        rows *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+公司名稱合併效能：greedy 與 cluster 模式（不同行程數）
+使用方式: python benchmarks/bench_similar_merge.py [名稱數]
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from keyword_similar_func import merge_companies, cluster_companies
+
+def company_names(n, seed=0):
+    rng = random.Random(seed)
+    pool = [chr(c) for c in range(0x4e00, 0x4e00 + 800)]
+    suffixes = ['', '股份有限公司', '有限公司', '科技', '_台北', '_VN']
+    bases = [''.join(rng.choice(pool) for _ in range(rng.randint(3, 8))) for _ in range(max(1, n // 3))]
+    names = []
+    for _ in range(n):
+        base = rng.choice(bases)
+        if rng.random() < 0.2 and len(base) > 3:
+            i = rng.randrange(len(base))
+            base = base[:i] + rng.choice(pool) + base[i + 1:]
+        names.append(base + rng.choice(suffixes))
+    return names
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    df = pd.DataFrame({'company': company_names(n), 'count': 1})
+    print(f"names={n} cpus={os.cpu_count()}")
+    t0 = time.perf_counter()
+    merge_companies(df)
+    print(f"{'greedy':>12} {time.perf_counter() - t0:>8.2f}s")
+    baseline = None
+    reference = None
+    for workers in (1, 2, 4, 8, 16):
+        t0 = time.perf_counter()
+        result = cluster_companies(df, workers=workers)
+        elapsed = time.perf_counter() - t0
+        baseline = baseline or elapsed
+        if reference is None:
+            reference = result
+        assert result.equals(reference), "cluster 結果應與行程數無關"
+        print(f"{'cluster x' + str(workers):>12} {elapsed:>8.2f}s {baseline / elapsed:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+相似度計分吞吐量：每對新建 SequenceMatcher 與共用相似度核心（提早排除、set_seq2 批次）
+使用方式: python benchmarks/bench_similarity.py [候選數]
+"""
+import os
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import similarity_func
+from similarity_func import similarity, similarity_many
+
+def make_strings(n, seed=0):
+    rng = random.Random(seed)
+    pool = [chr(c) for c in range(0x4e00, 0x4e00 + 500)]
+    return [''.join(rng.choice(pool) for _ in range(rng.randint(4, 16))) for _ in range(n)]
+
+def report(label, pairs, elapsed):
+    print(f"{label:<28} {pairs / elapsed:>12,.0f} pairs/s")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    threshold = 0.8
+    queries = make_strings(50, seed=1)
+    candidates = make_strings(n, seed=2)
+    pairs = len(queries) * len(candidates)
+    print(f"queries={len(queries)} candidates={n} threshold={threshold}")
+
+    t0 = time.perf_counter()
+    expected = [[SequenceMatcher(None, a, b).ratio() >= threshold for a in candidates] for b in queries]
+    report('SequenceMatcher per pair', pairs, time.perf_counter() - t0)
+
+    similarity_func._pair_cache.data.clear()
+    t0 = time.perf_counter()
+    got = [[similarity(a, b, threshold) >= threshold for a in candidates] for b in queries]
+    report('similarity (early exit)', pairs, time.perf_counter() - t0)
+    assert got == expected
+
+    similarity_func._pair_cache.data.clear()
+    t0 = time.perf_counter()
+    got = [[s >= threshold for s in similarity_many(candidates, b, threshold)] for b in queries]
+    report('similarity_many (set_seq2)', pairs, time.perf_counter() - t0)
+    assert got == expected
+
+    # 近似重複的候選：配對都達到門檻，必須完整計算，重複出現時由配對快取命中
+    near = {b: [b[:i] + 'x' + b[i + 1:] for i in range(len(b)) for _ in range(max(1, n // 20))] for b in queries}
+    near_pairs = sum(len(v) for v in near.values())
+    t0 = time.perf_counter()
+    for b, group in near.items():
+        [SequenceMatcher(None, a, b).ratio() for a in group]
+    report('near-dup, per pair', near_pairs, time.perf_counter() - t0)
+    similarity_func._pair_cache.data.clear()
+    t0 = time.perf_counter()
+    for b, group in near.items():
+        similarity_many(group, b, 0.5)
+    report('near-dup, similarity_many', near_pairs, time.perf_counter() - t0)
+    print(similarity_func.cache_info())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+表格智能匹配平行加速比：1/2/4/8 個行程，並確認結果與單行程完全相同
+使用方式: python benchmarks/bench_table_matcher.py [主表列數] [標籤列數]
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from table_matcher_func import table_matcher
+
+# 近似模式的候選數（table_matcher 預設 None 為精算全部標籤）
+TOP_K = 50
+
+def make_tables(n_main, n_tag, seed=0):
+    rng = random.Random(seed)
+    pool = [chr(c) for c in range(0x4e00, 0x4e00 + 300)] + list('ABCDEFGH0123456789')
+    names = [''.join(rng.choice(pool) for _ in range(rng.randint(4, 12))) for _ in range(n_tag)]
+    def variant(name):
+        if rng.random() < 0.5:
+            return name
+        i = rng.randrange(len(name))
+        return name[:i] + rng.choice(pool) + name[i + 1:]
+    tag_df = pd.DataFrame({
+        'tag1': names,
+        'tag2': [variant(rng.choice(names)) for _ in range(n_tag)],
+        'tag_name': [f'T{i}' for i in range(n_tag)],
+        'tag_value': [rng.randint(1, 100) for _ in range(n_tag)],
+    })
+    main_df = pd.DataFrame({
+        'field1': [variant(rng.choice(names)) for _ in range(n_main)],
+        'field2': [variant(rng.choice(names)) for _ in range(n_main)],
+    })
+    return main_df, tag_df
+
+def main():
+    n_main = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    n_tag = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    main_df, tag_df = make_tables(n_main, n_tag)
+    fields = dict(main_field1='field1', main_field2='field2', tag_field1='tag1', tag_field2='tag2',
+                  tag_name_field='tag_name', tag_value_field='tag_value', top_k=TOP_K)
+    print(f"main={n_main} tag={n_tag} top_k={TOP_K} cpus={os.cpu_count()}")
+    baseline = None
+    reference = None
+    for workers in (1, 2, 4, 8):
+        t0 = time.perf_counter()
+        result_df, unmatched_df = table_matcher(main_df, tag_df, workers=workers, **fields)
+        elapsed = time.perf_counter() - t0
+        baseline = baseline or elapsed
+        if reference is None:
+            reference = (result_df, unmatched_df)
+        assert result_df.equals(reference[0]) and unmatched_df.equals(reference[1]), "平行結果應與單行程相同"
+        print(f"workers={workers:<2} {elapsed:>8.2f}s {baseline / elapsed:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
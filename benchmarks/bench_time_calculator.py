@@ -0,0 +1,74 @@
+"""
+時區轉換與工作時數計算效能比較：逐列 pytz 時區物件 + 逐日累加 與 整欄向量化計算
+使用方式: python benchmarks/bench_time_calculator.py [列數] [逐列比較的列數]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from time_calculator_func import advanced_time_calculator, calculate_durations
+
+SOURCE_TZ, TARGET_TZ = 'UTC', 'Asia/Taipei'
+
+def make_frame(rows):
+    rng = random.Random(0)
+    base = pd.Timestamp('2024-01-01').value // 10**9
+    starts = [base + rng.randint(0, 365 * 86400) for _ in range(rows)]
+    ends = [s + rng.choice([rng.randint(0, 10 * 3600), rng.randint(0, 10 * 86400)]) for s in starts]
+    fmt = lambda t: pd.Timestamp(t, unit='s').strftime('%Y-%m-%d %H:%M:%S')
+    return pd.DataFrame({
+        '人員': [f'員工{rng.randint(0, 99)}' for _ in range(rows)],
+        '開始時間': [fmt(t) for t in starts],
+        '結束時間': [fmt(t) for t in ends],
+    })
+
+def per_row(df):
+    # 逐列建立時區物件，逐日累加 09:00-18:00 的工作秒數
+    source, target = pytz.timezone(SOURCE_TZ), pytz.timezone(TARGET_TZ)
+    hours = []
+    for _, row in df.iterrows():
+        s = source.localize(pd.to_datetime(row['開始時間']).to_pydatetime()).astimezone(target).replace(tzinfo=None)
+        e = source.localize(pd.to_datetime(row['結束時間']).to_pydatetime()).astimezone(target).replace(tzinfo=None)
+        total, day = 0.0, s.replace(hour=0, minute=0, second=0)
+        while day <= e:
+            if day.weekday() < 5:
+                a, b = max(s, day + timedelta(hours=9)), min(e, day + timedelta(hours=18))
+                total += max(0.0, (b - a).total_seconds())
+            day += timedelta(days=1)
+        hours.append(total / 3600)
+    return np.array(hours)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    df = make_frame(rows)
+    path = os.path.join(tempfile.mkdtemp(), 'log.csv')
+    df.to_csv(path, index=False)
+    print(f"rows={rows} per-row sample={sample}")
+    print(f"{'mode':>28} {'time(s)':>8} {'rows/s':>10}")
+    t0 = time.perf_counter()
+    expected = per_row(df.iloc[:sample])
+    elapsed = time.perf_counter() - t0
+    print(f"{'per-row pytz (sample)':>28} {elapsed:>8.2f} {sample / elapsed:>10.0f}")
+    t0 = time.perf_counter()
+    got = calculate_durations(df.iloc[:sample], '開始時間', '結束時間', SOURCE_TZ, TARGET_TZ)['工作時數'].to_numpy()
+    elapsed = time.perf_counter() - t0
+    print(f"{'vectorized (sample)':>28} {elapsed:>8.2f} {sample / elapsed:>10.0f}")
+    np.testing.assert_allclose(got, expected)
+    t0 = time.perf_counter()
+    _, summary = advanced_time_calculator(path, '開始時間', '結束時間', SOURCE_TZ, TARGET_TZ,
+                                          group_by=['人員'], detail=False)
+    elapsed = time.perf_counter() - t0
+    print(f"{'vectorized file + group_by':>28} {elapsed:>8.2f} {rows / elapsed:>10.0f}")
+    assert summary['筆數'].sum() == rows
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+時間格式轉換效能比較：逐一 pd.to_datetime（每個值各自推斷格式）與推斷格式後整批解析
+使用方式: python benchmarks/bench_timeformattransfer.py [列數]
+"""
+import os
+import random
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from timeformattransfer_func import convert_column, format_cache_stats
+
+TARGET = '%Y-%m-%d %H:%M:%S'
+
+def make_column(rows, formats):
+    rng = random.Random(0)
+    base = pd.Timestamp('2020-01-01').value // 10**9
+    values = []
+    for _ in range(rows):
+        ts = pd.Timestamp(base + rng.randint(0, 5 * 365 * 86400), unit='s')
+        values.append(rng.choice(['', 'N/A']) if rng.random() < 0.01 else ts.strftime(rng.choice(formats)))
+    return pd.Series(values, dtype=object)
+
+def per_element(values):
+    out = []
+    for v in values:
+        try:
+            ts = pd.to_datetime(v)
+        except (ValueError, TypeError):
+            ts = None
+        out.append(None if ts is None or pd.isna(ts) else ts.strftime(TARGET))
+    return out
+
+def mixed(values):
+    parsed = pd.to_datetime(values, format='mixed', errors='coerce')
+    return parsed.dt.strftime(TARGET).astype(object).where(parsed.notna(), None).tolist()
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    columns = {
+        'single format': make_column(rows, ['%Y/%m/%d %H:%M']),
+        'three formats': make_column(rows, ['%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y%m%d']),
+        # 非 ISO 格式：to_datetime('mixed') 須逐一交給 dateutil 解析
+        'non-ISO': make_column(rows, ['%m/%d/%Y %I:%M %p', '%d %b %Y %H:%M']),
+    }
+    print(f"rows={rows}")
+    print(f"{'column':>14} {'method':>22} {'time(s)':>8} {'rows/s':>10}")
+    warnings.simplefilter('ignore', UserWarning)
+    for name, values in columns.items():
+        results = {}
+        for method, func in (('per-element to_datetime', per_element),
+                             ("to_datetime('mixed')", mixed),
+                             ('inferred format', lambda v: convert_column(v, TARGET)[0].tolist()),
+                             ('inferred (cached)', lambda v: convert_column(v, TARGET)[0].tolist())):
+            t0 = time.perf_counter()
+            results[method] = func(values)
+            elapsed = time.perf_counter() - t0
+            print(f"{name:>14} {method:>22} {elapsed:>8.2f} {rows / elapsed:>10.0f}")
+        expected = results['per-element to_datetime']
+        for method, result in results.items():
+            assert result == expected, method
+    print(format_cache_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+workcloud 繪圖吞吐量比較：每次重建遮罩/背景/字型 與 依尺寸快取，多執行緒同時繪圖，以及 PNG 與 SVG 輸出
+使用方式: python benchmarks/bench_workcloud.py [繪圖次數] [執行緒數]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import workcloud_func
+from workcloud_func import workcloud
+
+def clear_assets():
+    for func in (workcloud_func.create_cloud_mask, workcloud_func.create_background,
+                 workcloud_func.background_image, workcloud_func.get_font_path):
+        func.cache_clear()
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rng = random.Random(0)
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'companies.csv')
+    pd.DataFrame({
+        'company': [f'公司{i}' for i in range(60)],
+        'count': [rng.randint(1, 500) for _ in range(60)],
+    }).to_csv(path, index=False)
+
+    def render(i, cold=False, output_format='png'):
+        if cold:
+            clear_assets()
+        return workcloud(path, out_dir=os.path.join(tmp, f'{output_format}{i}'), output_format=output_format)
+
+    def output_kb(paths):
+        return sum(os.path.getsize(p) for pair in paths for p in pair) / len(paths) / 1024
+
+    print(f"renders={renders}")
+    print(f"{'mode':>24} {'time(s)':>8} {'renders/s':>10} {'KB/render':>10}")
+    t0 = time.perf_counter()
+    for i in range(renders):
+        render(i, cold=True)
+    t_cold = time.perf_counter() - t0
+    print(f"{'rebuild assets':>24} {t_cold:>8.2f} {renders / t_cold:>10.2f}")
+    clear_assets()
+    render(0)
+    t0 = time.perf_counter()
+    paths = [render(i) for i in range(renders)]
+    t_warm = time.perf_counter() - t0
+    print(f"{'cached assets':>24} {t_warm:>8.2f} {renders / t_warm:>10.2f} {output_kb(paths):>10.1f}")
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        paths = list(pool.map(render, range(renders)))
+    t_threads = time.perf_counter() - t0
+    assert all(os.path.exists(p) for pair in paths for p in pair)
+    print(f"{f'cached, {threads} threads':>24} {t_threads:>8.2f} {renders / t_threads:>10.2f}")
+    t0 = time.perf_counter()
+    paths = [render(i, output_format='svg') for i in range(renders)]
+    t_svg = time.perf_counter() - t0
+    for pair in paths:
+        for p in pair:
+            ET.parse(p)
+    print(f"{'svg output':>24} {t_svg:>8.2f} {renders / t_svg:>10.2f} {output_kb(paths):>10.1f}")
+
+if __name__ == "__main__":
+    main()
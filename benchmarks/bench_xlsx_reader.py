@@ -0,0 +1,63 @@
+"""
+xlsx 讀取效能比較：pd.read_excel 與欄位投影串流讀取器（解析時間、峰值 RSS）
+使用方式: python benchmarks/bench_xlsx_reader.py [列數] [欄數]
+每個情境在獨立子行程執行，峰值 RSS 才不會互相影響
+"""
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from file_loader_func import read_xlsx
+
+def make_workbook(path, rows, cols):
+    from openpyxl import Workbook
+    rng = random.Random(0)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['company', 'count', '主旨'] + [f'col{i}' for i in range(cols - 3)])
+    for i in range(rows):
+        ws.append([f'公司{rng.randint(0, 5000)}', rng.randint(1, 100), f'工單{i} 帳號異常']
+                  + [rng.random() if j % 2 else f'v{rng.randint(0, 999)}' for j in range(cols - 3)])
+    wb.save(path)
+
+def run_case(path, reader, usecols):
+    cols = usecols.split(',') if usecols else None
+    t0 = time.perf_counter()
+    if reader == 'pandas':
+        df = pd.read_excel(path, usecols=cols)
+    else:
+        df = read_xlsx(path, cols)
+    elapsed = time.perf_counter() - t0
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{elapsed:.3f} {peak_mb:.1f} {df.shape[0]} {df.shape[1]}")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--case':
+        run_case(*sys.argv[2:5])
+        return
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    path = os.path.join(tempfile.mkdtemp(), 'wide.xlsx')
+    make_workbook(path, rows, cols)
+    print(f"rows={rows} cols={cols} size={os.path.getsize(path) / 1e6:.1f}MB")
+    print(f"{'usecols':>20} {'reader':>8} {'time(s)':>8} {'peakRSS(MB)':>12} {'shape':>12}")
+    # 依各端點實際需要的欄位：keyword_count 一欄、workcloud 兩欄、table_matcher 全部
+    for usecols in ('主旨', 'company,count', ''):
+        for reader in ('pandas', 'stream'):
+            out = subprocess.run([sys.executable, __file__, '--case', path, reader, usecols],
+                                 capture_output=True, text=True, check=True).stdout.split()
+            elapsed, peak, n_rows, n_cols = out
+            print(f"{usecols or '(all)':>20} {reader:>8} {float(elapsed):>8.2f} {float(peak):>12.1f} {n_rows + 'x' + n_cols:>12}")
+        if usecols:
+            expected = pd.read_excel(path, usecols=usecols.split(','))
+            pd.testing.assert_frame_equal(expected, read_xlsx(path, usecols.split(',')))
+
+if __name__ == "__main__":
+    main()
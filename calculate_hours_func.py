@@ -0,0 +1,123 @@
+import os
+import math
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from pandas.errors import OutOfBoundsDatetime
+from file_loader_func import Source, iter_table_chunks
+
+# 批次計算每塊列數
+CALCULATE_HOURS_CHUNKSIZE = int(os.environ.get('CALCULATE_HOURS_CHUNKSIZE', 100000))
+RESULT_COLUMN = '計算工時'
+
+def calculate_hours(start_time, end_time):
+    """計算時間差，以0.5小時為最小單位，跨日按天數計算"""
+    if start_time is None or end_time is None:
+        return None
+    try:
+        days_diff = (end_time.date() - start_time.date()).days
+        if days_diff == 0:
+            time_diff = end_time - start_time
+            hours = time_diff.total_seconds() / 3600
+            if hours < 0:
+                hours = 0.0
+        else:
+            hours = days_diff * 6.0
+        rounded_hours = math.ceil(hours * 2) / 2
+        return rounded_hours
+    except Exception as e:
+        return None
+
+def parse_time(val):
+    """單一值轉為時間，無法轉換時回傳 None"""
+    try:
+        return pd.to_datetime(val)
+    except Exception:
+        return None
+
+def parse_time_column(values: pd.Series) -> Optional[pd.Series]:
+    """
+    整欄一次轉為時間（無法解析為 NaT），結果與逐一 parse_time 相同
+    混合時區、布林值等無法整欄轉換，或逐一轉換會得到不同結果時回傳 None
+    """
+    if is_datetime64_any_dtype(values):
+        return values
+    try:
+        parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not is_datetime64_any_dtype(parsed):
+        return None
+    # 整欄轉換失敗的值再逐一確認，避免格式推斷不同而漏算
+    failed = values[parsed.isna() & values.notna()]
+    for val in pd.unique(failed):
+        if not pd.isna(parse_time(val)):
+            return None
+    return parsed
+
+def wall_and_utc(times: pd.Series):
+    """回傳 (當地時間, UTC) 的 datetime64[ns] 陣列；無時區時兩者相同"""
+    if times.dt.tz is None:
+        wall = times.dt.as_unit('ns').to_numpy()
+        return wall, wall
+    return (times.dt.tz_localize(None).dt.as_unit('ns').to_numpy(),
+            times.dt.tz_convert('UTC').dt.tz_localize(None).dt.as_unit('ns').to_numpy())
+
+def calculate_hours_columns(start: pd.Series, end: pd.Series) -> pd.Series:
+    """
+    start, end: 開始與結束時間欄位（任意可轉為時間的值）
+    return: 與逐列 calculate_hours(parse_time(開始), parse_time(結束)) 相同的結果（float 或 None）
+    """
+    starts, ends = parse_time_column(start), parse_time_column(end)
+    try:
+        if starts is None or ends is None:
+            raise TypeError
+        s_wall, s_utc = wall_and_utc(starts)
+        e_wall, e_utc = wall_and_utc(ends)
+    except (TypeError, OutOfBoundsDatetime):
+        # 無法整欄計算時逐列處理
+        return pd.Series([calculate_hours(parse_time(s), parse_time(e)) for s, e in zip(start, end)],
+                         index=start.index, dtype=object)
+    valid = ~(np.isnat(s_wall) | np.isnat(e_wall))
+    days = (e_wall.astype('datetime64[D]') - s_wall.astype('datetime64[D]')).astype(np.int64)
+    ns = (e_utc - s_utc).astype(np.int64)
+    # Timedelta.total_seconds 以微秒為單位
+    seconds = (ns // 1000) / 1e6
+    same_day = days == 0
+    hours = np.where(same_day, np.maximum(seconds / 3600, 0.0), days * 6.0)
+    if (starts.dt.tz is None) != (ends.dt.tz is None):
+        # 有時區與無時區的時間不能相減，同日的列與逐列計算一樣為 None
+        valid &= ~same_day
+    rounded = np.ceil(hours * 2) / 2
+    result = np.full(len(start), None, dtype=object)
+    result[valid] = rounded[valid].tolist()
+    return pd.Series(result, index=start.index, dtype=object)
+
+def iter_calculate_hours(file_path: Source, start_col: str, end_col: str,
+                         chunksize: int = CALCULATE_HOURS_CHUNKSIZE) -> Iterator[pd.DataFrame]:
+    """逐塊讀取檔案並加上計算工時欄位"""
+    for chunk in iter_table_chunks(file_path, chunksize):
+        missing = [c for c in (start_col, end_col) if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"找不到欄位：{', '.join(missing)}")
+        chunk = chunk.copy()
+        chunk[RESULT_COLUMN] = calculate_hours_columns(chunk[start_col], chunk[end_col])
+        yield chunk
+
+def batch_calculate_hours(file_path: Source, start_col: str, end_col: str, output_path: Optional[str]=None,
+                          chunksize: int = CALCULATE_HOURS_CHUNKSIZE) -> pd.DataFrame:
+    """
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
+    start_col, end_col: 開始與結束時間欄位
+    output_path: 結果CSV路徑（可選，逐塊寫入）
+    chunksize: 每塊列數，CSV 逐塊讀取
+    return: 原始欄位加上計算工時欄位的 DataFrame（合併所有塊；不需整份結果時以 iter_calculate_hours 逐塊處理）
+    """
+    chunks = []
+    for i, chunk in enumerate(iter_calculate_hours(file_path, start_col, end_col, chunksize)):
+        if output_path:
+            chunk.to_csv(output_path, mode='a' if i else 'w', header=not i, index=False,
+                         encoding='utf-8' if i else 'utf-8-sig')
+        chunks.append(chunk)
+    return pd.concat(chunks) if chunks else pd.DataFrame(columns=[start_col, end_col, RESULT_COLUMN])
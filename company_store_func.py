@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+import pandas as pd
+from file_loader_func import Source, load_table, source_name
+from keyword_extraction_func import extract_companies
+
+# 公司統計彙總資料庫路徑
+COMPANY_STORE_PATH = os.environ.get('COMPANY_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'company_store', 'company_store.sqlite3'))
+# 預設去重鍵欄位（逗號分隔）；未設定時以整列內容判斷是否重複
+COMPANY_STORE_KEY = [c for c in os.environ.get('COMPANY_STORE_KEY', '').split(',') if c]
+
+SUBJECT_COLUMNS = ['主旨', 'subject', '主題', 'title']
+DATE_COLUMNS = ['日期', 'date', '建立時間', '建立日期', 'created', 'created_at', '時間']
+# 彙總期間單位：查詢時以日期字串前綴分組
+PERIOD_LENGTH = {'day': 10, 'month': 7, 'year': 4}
+UNDATED = ''
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS seen_rows (
+    key BLOB PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS company_counts (
+    period TEXT NOT NULL,
+    company TEXT NOT NULL,
+    count NUMERIC NOT NULL,
+    PRIMARY KEY (period, company)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingests (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    rows INTEGER NOT NULL,
+    new_rows INTEGER NOT NULL,
+    created TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+_schema_ready = set()
+_lock = threading.Lock()
+
+@contextmanager
+def connect(path: Optional[str]=None) -> Iterator[sqlite3.Connection]:
+    """每次呼叫各自開啟連線；WAL 模式下查詢不會被寫入阻擋"""
+    path = path or COMPANY_STORE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        with _lock:
+            if path not in _schema_ready:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(SCHEMA)
+                _schema_ready.add(path)
+        yield conn
+    finally:
+        conn.close()
+
+def row_keys(df: pd.DataFrame, key_columns: Sequence[str]) -> pd.Series:
+    """各列去重鍵欄位值的雜湊（16 bytes），欄位值一律以字串比較"""
+    missing = [c for c in key_columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"找不到去重鍵欄位：{', '.join(map(str, missing))}")
+    # 空值以不會出現在一般文字中的字元代表，避免與空字串相同
+    parts = [df[c].astype(str).fillna('\x00') for c in key_columns]
+    joined = parts[0].str.cat(parts[1:], sep='\x1f') if len(parts) > 1 else parts[0]
+    # 相同內容只雜湊一次
+    codes, uniques = pd.factorize(joined)
+    digests = [hashlib.blake2b(v.encode('utf-8'), digest_size=16).digest() for v in uniques]
+    return pd.Series([digests[c] for c in codes], index=df.index, dtype=object)
+
+def to_periods(values: pd.Series) -> pd.Series:
+    """日期欄位轉為 YYYY-MM-DD；無法解析的值歸入未標日期"""
+    dates = pd.to_datetime(values, errors='coerce', format='mixed')
+    return dates.dt.strftime('%Y-%m-%d').fillna(UNDATED)
+
+def find_column(columns: Sequence, candidates: List[str]) -> Optional[str]:
+    return next((c for c in candidates if c in columns), None)
+
+def company_rows(df: pd.DataFrame, mode: str) -> pd.DataFrame:
+    """
+    依模式取得各列的公司與次數
+    mode='subject'：由主旨欄位提取公司，每列計一次（同 keyword_extraction）
+    mode='company'：直接使用 company、count 欄位（同 workcloud）
+    """
+    if mode == 'subject':
+        col = find_column(df.columns, SUBJECT_COLUMNS)
+        if not col:
+            raise ValueError(f"找不到主旨欄位，請確認欄位名稱（支援：{', '.join(SUBJECT_COLUMNS)}）")
+        return pd.DataFrame({'company': extract_companies(df[col].astype(str)), 'count': 1}, index=df.index)
+    if mode == 'company':
+        lower = {str(c).lower(): c for c in df.columns}
+        if 'company' not in lower or 'count' not in lower:
+            raise ValueError("找不到 company、count 欄位")
+        return pd.DataFrame({
+            'company': df[lower['company']],
+            'count': pd.to_numeric(df[lower['count']], errors='coerce').fillna(0),
+        }, index=df.index)
+    raise ValueError(f"不支援的匯入模式：{mode}")
+
+def ingest(file_path: Source, mode: str='subject', key_columns: Optional[Sequence[str]]=None,
+           date_column: Optional[str]=None, store_path: Optional[str]=None) -> dict:
+    """
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
+    mode: 'subject'（由主旨提取公司）或 'company'（company、count 欄位）
+    key_columns: 去重鍵欄位，已匯入過的列不再重複計數；未指定時使用 COMPANY_STORE_KEY，皆未設定則以整列判斷
+                 （同一資料來源需固定使用相同的去重鍵，不同設定產生的鍵不會互相比對）
+    date_column: 日期欄位，未指定時自動偵測；無日期欄位的列歸入未標日期
+    store_path: 資料庫路徑（可選）
+    return: 匯入統計
+    """
+    key_columns = list(key_columns or COMPANY_STORE_KEY)
+    if key_columns:
+        # 指定去重鍵時只讀取需要的欄位
+        wanted = set(key_columns) | set(SUBJECT_COLUMNS) | set(DATE_COLUMNS) | {date_column}
+        df = load_table(file_path, usecols=lambda c: c in wanted or str(c).lower() in ('company', 'count'))
+    else:
+        df = load_table(file_path)
+    date_column = date_column or find_column(df.columns, DATE_COLUMNS)
+    if date_column and date_column not in df.columns:
+        raise ValueError(f"找不到日期欄位：{date_column}")
+    keys = row_keys(df, key_columns or list(df.columns))
+    # 同一檔案內的重複列只保留第一筆
+    first = ~keys.duplicated()
+    df, keys = df[first], keys[first]
+    rows = company_rows(df, mode)
+    rows['period'] = to_periods(df[date_column]) if date_column else UNDATED
+    with connect(store_path) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS incoming (key BLOB PRIMARY KEY) WITHOUT ROWID')
+            conn.execute('DELETE FROM incoming')
+            conn.executemany('INSERT INTO incoming VALUES (?)', ((k,) for k in keys))
+            seen = {k for (k,) in conn.execute('SELECT key FROM incoming WHERE key IN (SELECT key FROM seen_rows)')}
+            new = ~keys.isin(seen) if seen else pd.Series(True, index=keys.index)
+            conn.execute('INSERT OR IGNORE INTO seen_rows SELECT key FROM incoming')
+            new_rows = rows[new].dropna(subset=['company'])
+            totals = new_rows.groupby(['period', 'company'], sort=False)['count'].sum()
+            conn.executemany(
+                'INSERT INTO company_counts (period, company, count) VALUES (?, ?, ?) '
+                'ON CONFLICT (period, company) DO UPDATE SET count = count + excluded.count',
+                ((period, str(company), count.item() if hasattr(count, 'item') else count)
+                 for (period, company), count in totals.items()))
+            conn.execute('INSERT INTO ingests (source, rows, new_rows) VALUES (?, ?, ?)',
+                         (source_name(file_path), len(first), int(new.sum())))
+            conn.execute('DELETE FROM incoming')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    return {
+        'rows': len(first),
+        'new_rows': int(new.sum()),
+        'duplicates': len(first) - int(new.sum()),
+        'companies': int(totals.index.get_level_values('company').nunique()),
+        'date_column': date_column,
+    }
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    if value in (None, ''):
+        return None
+    try:
+        return pd.Timestamp(value).strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"無效的日期：{value}")
+
+def query_counts(start: Optional[str]=None, end: Optional[str]=None, group_by: Optional[str]=None,
+                 top: Optional[int]=None, store_path: Optional[str]=None) -> pd.DataFrame:
+    """
+    start, end: 日期範圍（含兩端）；指定任一端時不含未標日期的資料
+    group_by: None 為整段合計，'day'/'month'/'year' 依期間分列
+    top: 只回傳次數最多的前幾名（可選，僅整段合計時有效）
+    return: company、count 欄位（依期間分列時另有 period 欄位）
+    """
+    if group_by is not None and group_by not in PERIOD_LENGTH:
+        raise ValueError(f"不支援的期間單位：{group_by}")
+    start, end = normalize_date(start), normalize_date(end)
+    where, args = [], []
+    if start or end:
+        where.append('period != ?')
+        args.append(UNDATED)
+    if start:
+        where.append('period >= ?')
+        args.append(start)
+    if end:
+        where.append('period <= ?')
+        args.append(end)
+    clause = f"WHERE {' AND '.join(where)}" if where else ''
+    if group_by:
+        sql = (f'SELECT substr(period, 1, {PERIOD_LENGTH[group_by]}) AS period, company, SUM(count) AS count '
+               f'FROM company_counts {clause} GROUP BY 1, 2 ORDER BY 1, 3 DESC, 2')
+        columns = ['period', 'company', 'count']
+    else:
+        sql = f'SELECT company, SUM(count) AS count FROM company_counts {clause} GROUP BY 1 ORDER BY 2 DESC, 1'
+        columns = ['company', 'count']
+        if top:
+            sql += ' LIMIT ?'
+            args.append(int(top))
+    with connect(store_path) as conn:
+        return pd.DataFrame(conn.execute(sql, args).fetchall(), columns=columns)
+
+def store_stats(store_path: Optional[str]=None) -> dict:
+    with connect(store_path) as conn:
+        rows, = conn.execute('SELECT COUNT(*) FROM seen_rows').fetchone()
+        companies, first, last = conn.execute(
+            "SELECT COUNT(DISTINCT company), MIN(NULLIF(period, '')), MAX(NULLIF(period, '')) FROM company_counts").fetchone()
+        ingests, = conn.execute('SELECT COUNT(*) FROM ingests').fetchone()
+    return {'rows': rows, 'companies': companies, 'first_period': first, 'last_period': last, 'ingests': ingests}
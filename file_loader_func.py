@@ -0,0 +1,281 @@
+import os
+import codecs
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import IO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+
+# 已解析 DataFrame 快取的記憶體上限（MB）
+LOADER_CACHE_MB = float(os.environ.get('LOADER_CACHE_MB', 512))
+# CSV 依序嘗試的編碼
+CSV_ENCODINGS = ('utf-8', 'gbk', 'big5')
+
+Usecols = Optional[Union[Sequence[str], Callable[[str], bool]]]
+# 檔案來源：路徑，或帶有檔名的上傳串流（如 werkzeug FileStorage，以 filename 判斷格式）
+Source = Union[str, IO[bytes]]
+
+class DataFrameCache:
+    """以（檔案內容雜湊, 副檔名, 欄位）為鍵的 LRU 快取，依 DataFrame 實際記憶體用量淘汰"""
+    def __init__(self, budget_bytes: float):
+        self.budget_bytes = budget_bytes
+        self.data: "OrderedDict[tuple, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[pd.DataFrame]:
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            self.data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: tuple, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.budget_bytes:
+            return
+        with self.lock:
+            if key in self.data:
+                self.total_bytes -= self.data.pop(key)[1]
+            self.data[key] = (df, size)
+            self.total_bytes += size
+            while self.total_bytes > self.budget_bytes:
+                _, (_, old_size) = self.data.popitem(last=False)
+                self.total_bytes -= old_size
+
+    def clear(self) -> None:
+        with self.lock:
+            self.data.clear()
+            self.total_bytes = 0
+
+_cache = DataFrameCache(LOADER_CACHE_MB * 1024 * 1024)
+
+def source_name(source: Source) -> str:
+    if isinstance(source, str):
+        return source
+    return getattr(source, 'filename', None) or getattr(source, 'name', None) or ''
+
+def file_ext(source: Source) -> str:
+    return os.path.splitext(source_name(source))[1].lower()
+
+def rewind(source: Source) -> Source:
+    """回傳可直接交給 pandas/openpyxl 的路徑，或倒回開頭的串流"""
+    if isinstance(source, str):
+        return source
+    stream = getattr(source, 'stream', source)
+    stream.seek(0)
+    return stream
+
+def source_size(source: Source) -> int:
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    stream = rewind(source)
+    size = stream.seek(0, os.SEEK_END)
+    stream.seek(0)
+    return size
+
+def content_hash(source: Source) -> str:
+    h = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    else:
+        stream = rewind(source)
+        for block in iter(lambda: stream.read(1 << 20), b''):
+            h.update(block)
+        stream.seek(0)
+    return h.hexdigest()
+
+def read_csv_any(file_path: Source, **kwargs) -> pd.DataFrame:
+    for encoding in CSV_ENCODINGS:
+        try:
+            return pd.read_csv(rewind(file_path), encoding=encoding, **kwargs)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("無法讀取CSV文件，請檢查編碼格式")
+
+def convert_cell(cell):
+    """與 pandas 的 openpyxl 讀取器相同的儲存格轉換規則"""
+    value = cell.value
+    if value is None:
+        return ""
+    if cell.data_type == 'e':
+        return float('nan')
+    if cell.data_type == 'n':
+        val = int(value)
+        return val if val == value else float(value)
+    return value
+
+def trimmed(values: list) -> list:
+    """去掉列尾的空白儲存格"""
+    while values and values[-1] == "":
+        values.pop()
+    return values
+
+def iter_xlsx_rows(file_path: Source):
+    """
+    以 openpyxl 唯讀模式的公開 API 逐列產生第一個工作表的儲存格，與 pd.read_excel 的讀取方式相同：
+    不採用工作表記錄的範圍，缺少的列產生空列
+    """
+    wb = load_workbook(rewind(file_path), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        yield from ws.iter_rows()
+    finally:
+        wb.close()
+
+def read_xlsx(file_path: Source, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    以串流方式讀取 xlsx，只轉換需要的欄位，結果與 pd.read_excel(file_path, usecols=usecols) 相同
+    其他欄位仍需判斷是否有值，列尾只有其他欄位有值的列才會和 pd.read_excel 一樣保留
+    表頭重複、找不到欄位等特殊情況交回 pd.read_excel 處理
+    """
+    positions: Optional[List[int]] = None
+    data: List[list] = []
+    last = -1
+    rows = iter_xlsx_rows(file_path)
+    for row in rows:
+        if positions is None:
+            values = trimmed([convert_cell(cell) for cell in row])
+            has_data = bool(values)
+        else:
+            values = [convert_cell(row[i]) if i < len(row) else "" for i in positions]
+            has_data = any(cell.value is not None for cell in row)
+        data.append(values)
+        if has_data:
+            last = len(data) - 1
+        if usecols is not None and positions is None:
+            header = data[0]
+            wanted = [i for i, name in enumerate(header) if name in usecols]
+            if len(set(header)) != len(header) or "" in header or len(wanted) != len(set(usecols)):
+                break
+            positions = wanted
+            data[0] = [header[i] for i in wanted]
+    rows.close()
+    if usecols is not None and positions is None:
+        return pd.read_excel(rewind(file_path), usecols=list(usecols))
+    data = data[:last + 1]
+    if not data:
+        return pd.DataFrame()
+    width = max(len(row) for row in data)
+    for row in data:
+        row.extend([""] * (width - len(row)))
+    try:
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+def read_header(file_path: Source) -> List[str]:
+    ext = file_ext(file_path)
+    if ext == '.xlsx':
+        rows = iter_xlsx_rows(file_path)
+        row = trimmed([convert_cell(cell) for cell in next(rows, ())])
+        rows.close()
+        if row:
+            return list(TextParser([row], header=0).read().columns)
+        return list(pd.read_excel(rewind(file_path), nrows=0).columns)
+    elif ext == '.xls':
+        return list(pd.read_excel(rewind(file_path), nrows=0).columns)
+    elif ext == '.csv':
+        return list(read_csv_any(file_path, nrows=0).columns)
+    else:
+        raise ValueError(f"不支援的檔案格式：{ext}")
+
+def read_table(file_path: Source, usecols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """直接解析檔案（不經快取）"""
+    ext = file_ext(file_path)
+    if ext == '.xlsx':
+        return read_xlsx(file_path, usecols)
+    elif ext == '.xls':
+        return pd.read_excel(rewind(file_path), usecols=usecols)
+    elif ext == '.csv':
+        return read_csv_any(file_path, usecols=usecols)
+    else:
+        raise ValueError(f"不支援的檔案格式：{ext}")
+
+def load_table(file_path: Source, usecols: Usecols = None) -> pd.DataFrame:
+    """
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
+    usecols: 需要的欄位名稱，或判斷欄位名稱的函式（可選，預設全部欄位）
+    return: DataFrame（快取內容的複本，可自由修改）
+    同一檔案內容重複載入時直接使用快取，不必重新解析
+    """
+    ext = file_ext(file_path)
+    if ext not in ('.xls', '.xlsx', '.csv'):
+        raise ValueError(f"不支援的檔案格式：{ext}")
+    digest = content_hash(file_path)
+    if callable(usecols):
+        full = _cache.get((digest, ext, None))
+        header = list(full.columns) if full is not None else read_header(file_path)
+        usecols = [c for c in header if usecols(c)]
+    cols = tuple(usecols) if usecols is not None else None
+    df = _cache.get((digest, ext, cols))
+    if df is None and cols is not None:
+        # 已有完整表格時直接取出所需欄位（保持檔案中的欄位順序）
+        full = _cache.get((digest, ext, None))
+        if full is not None:
+            missing = [c for c in cols if c not in full.columns]
+            if missing:
+                raise ValueError(f"找不到欄位：{', '.join(map(str, missing))}")
+            df = full[[c for c in full.columns if c in cols]]
+    if df is not None:
+        _cache.hits += 1
+        return df.copy()
+    _cache.misses += 1
+    df = read_table(file_path, list(cols) if cols is not None else None)
+    _cache.put((digest, ext, cols), df)
+    return df.copy()
+
+def detect_csv_encoding(file_path: Source) -> str:
+    """依 CSV_ENCODINGS 順序找出能完整解碼的編碼（逐塊解碼，不解析內容）"""
+    for encoding in CSV_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        f = rewind(file_path)
+        f = open(f, 'rb') if isinstance(f, str) else f
+        try:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+        finally:
+            if isinstance(file_path, str):
+                f.close()
+    raise ValueError("無法讀取CSV文件，請檢查編碼格式")
+
+def iter_table_chunks(file_path: Source, chunksize: int, usecols: Usecols = None) -> Iterator[pd.DataFrame]:
+    """
+    逐塊產生 DataFrame，index 延續整份表格的列號
+    CSV 以 chunksize 串流讀取，記憶體用量只與 chunksize 有關；Excel 經 load_table 整份解析後再分塊
+    """
+    ext = file_ext(file_path)
+    if ext == '.csv':
+        encoding = detect_csv_encoding(file_path)
+        if callable(usecols):
+            usecols = [c for c in read_header(file_path) if usecols(c)]
+        yield from pd.read_csv(rewind(file_path), encoding=encoding, usecols=usecols, chunksize=chunksize)
+        return
+    df = load_table(file_path, usecols=usecols)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+def cache_stats() -> Dict[str, float]:
+    return {
+        'hits': _cache.hits,
+        'misses': _cache.misses,
+        'entries': len(_cache.data),
+        'bytes': _cache.total_bytes,
+        'budget_bytes': _cache.budget_bytes,
+    }
+
+def clear_cache() -> None:
+    _cache.clear()
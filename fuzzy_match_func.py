@@ -0,0 +1,113 @@
+import os
+from typing import Callable, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+from file_loader_func import Source, load_table
+from similarity_func import cached_normalize
+
+# 每批分數矩陣的格數上限（uint8，一格 1 byte），50k × 50k 時每批約 640 列
+FUZZY_MATCH_BATCH_CELLS = int(os.environ.get('FUZZY_MATCH_BATCH_CELLS', 32 * 1024 * 1024))
+# cdist 的執行緒數，-1 為使用全部核心
+FUZZY_MATCH_WORKERS = int(os.environ.get('FUZZY_MATCH_WORKERS', -1))
+
+# 與 fuzzywuzzy 同名的計分函式，分數為 0~100 的整數
+SCORERS = {
+    'ratio': fuzz.ratio,
+    'partial_ratio': fuzz.partial_ratio,
+    'token_sort_ratio': fuzz.token_sort_ratio,
+    'token_set_ratio': fuzz.token_set_ratio,
+    'WRatio': fuzz.WRatio,
+}
+SCORE_COLUMN = '相似度'
+
+def key_values(df: pd.DataFrame, columns: Optional[Sequence[str]]) -> pd.Series:
+    """比對鍵：多個欄位以空白串接後正規化；未指定時使用第一個欄位"""
+    columns = list(columns or df.columns[:1])
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"找不到欄位：{', '.join(map(str, missing))}")
+    text = df[columns[0]].fillna('').astype(str)
+    for col in columns[1:]:
+        text = text + ' ' + df[col].fillna('').astype(str)
+    return text.map(cached_normalize)
+
+def top_matches(queries: Sequence[str], choices: Sequence[str], scorer: str = 'WRatio', cutoff: int = 80,
+                top_k: int = 1, workers: int = FUZZY_MATCH_WORKERS,
+                progress: Optional[Callable[[float], None]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    queries, choices: 已正規化且不重複的比對鍵
+    return: (query 位置, choice 位置, 分數)；每個 query 取分數 >= cutoff 的前 top_k 個 choice，
+            依 query 位置、分數遞減、choice 位置排序
+    分批以 cdist 計算整塊分數矩陣，每批大小以 FUZZY_MATCH_BATCH_CELLS 限制記憶體
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"不支援的計分方式：{scorer}")
+    rows, cols, scores = [], [], []
+    if not len(queries) or not len(choices) or top_k <= 0:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.uint8)
+    k = min(top_k, len(choices))
+    batch_size = max(1, FUZZY_MATCH_BATCH_CELLS // len(choices))
+    for start in range(0, len(queries), batch_size):
+        # 低於 cutoff 的分數由 cdist 直接記為 0，可提早結束計算
+        matrix = process.cdist(queries[start:start + batch_size], choices, scorer=SCORERS[scorer],
+                               score_cutoff=cutoff, dtype=np.uint8, workers=workers)
+        # 每列第 k 高的分數作為門檻，只取出達門檻的格子，不建立整塊的排序索引
+        kth = np.partition(matrix, len(choices) - k, axis=1)[:, len(choices) - k]
+        hit_rows, hit_cols = np.nonzero(matrix >= np.maximum(kth, max(cutoff, 1))[:, None])
+        values = matrix[hit_rows, hit_cols]
+        order = np.lexsort((hit_cols, -values.astype(np.int16), hit_rows))
+        hit_rows, hit_cols, values = hit_rows[order], hit_cols[order], values[order]
+        # 與第 k 名同分的格子可能超過 k 個，依位置只保留前 k 個
+        rank = np.arange(len(hit_rows)) - np.searchsorted(hit_rows, hit_rows)
+        keep = rank < k
+        rows.append(hit_rows[keep] + start)
+        cols.append(hit_cols[keep])
+        scores.append(values[keep])
+        if progress:
+            progress(min(start + batch_size, len(queries)) / len(queries))
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(scores)
+
+def fuzzy_match(file_a: Source, file_b: Source, key_a: Optional[Sequence[str]] = None,
+                key_b: Optional[Sequence[str]] = None, scorer: str = 'WRatio', cutoff: float = 80,
+                top_k: int = 1, workers: int = FUZZY_MATCH_WORKERS,
+                progress: Optional[Callable[[float], None]] = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    file_a, file_b: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
+    key_a, key_b: 兩表的比對欄位（可多欄），未指定時使用第一個欄位
+    scorer: 計分方式（ratio、partial_ratio、token_sort_ratio、token_set_ratio、WRatio）
+    cutoff: 分數下限（0~100）
+    top_k: A 表每個比對鍵最多配對的 B 表比對鍵數；B 表中比對鍵相同的列都會列出
+    workers: 計分的執行緒數，-1 為使用全部核心
+    progress: 進度回呼，參數為 0~1 的完成比例（可選）
+    return: (配對結果, A 表未配對的列, B 表未配對的列)
+    相同的正規化比對鍵只計分一次，空白的比對鍵不參與配對
+    """
+    df_a, df_b = load_table(file_a), load_table(file_b)
+    codes_a, uniques_a = pd.factorize(key_values(df_a, key_a))
+    codes_b, uniques_b = pd.factorize(key_values(df_b, key_b))
+    # 空白比對鍵不參與計分
+    queries = [v for v in uniques_a if v]
+    choices = [v for v in uniques_b if v]
+    query_codes = np.flatnonzero(np.asarray(uniques_a, dtype=object) != '')
+    choice_codes = np.flatnonzero(np.asarray(uniques_b, dtype=object) != '')
+    q, c, score = top_matches(queries, choices, scorer, int(round(cutoff)), top_k, workers, progress)
+    pairs = pd.DataFrame({'a': query_codes[q], 'b': choice_codes[c], SCORE_COLUMN: score.astype(int)})
+    # 比對鍵配對展開為列配對：A 表依列順序，同一列再依分數遞減
+    rows_a = pd.DataFrame({'a': codes_a, 'row_a': np.arange(len(df_a))})
+    rows_b = pd.DataFrame({'b': codes_b, 'row_b': np.arange(len(df_b))})
+    pairs['rank'] = np.arange(len(pairs))
+    joined = (rows_a.merge(pairs, on='a').merge(rows_b, on='b')
+              .sort_values(['row_a', 'rank', 'row_b'], kind='stable'))
+    left = df_a.iloc[joined['row_a'].to_numpy()].reset_index(drop=True)
+    right = df_b.iloc[joined['row_b'].to_numpy()].reset_index(drop=True)
+    # 兩表欄位同名時加上來源後綴，與 merge 的 suffixes 相同
+    common = set(left.columns) & set(right.columns)
+    left = left.rename(columns={col: f'{col}_A' for col in common})
+    right = right.rename(columns={col: f'{col}_B' for col in common})
+    matched = pd.concat([left, right], axis=1)
+    matched[SCORE_COLUMN] = joined[SCORE_COLUMN].to_numpy()
+    unmatched_a = df_a[~np.isin(np.arange(len(df_a)), joined['row_a'].to_numpy())]
+    unmatched_b = df_b[~np.isin(np.arange(len(df_b)), joined['row_b'].to_numpy())]
+    return matched, unmatched_a, unmatched_b
@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+from file_loader_func import Source, file_ext, rewind
+
+# 工作狀態與結果存放目錄、保留時間（小時），過期的工作目錄會被清除
+JOB_DIR = os.environ.get('JOB_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs'))
+JOB_TTL_HOURS = float(os.environ.get('JOB_TTL_HOURS', 24))
+# 背景工作行程數上限
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1))
+# 進度寫入磁碟的最短間隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    """工作在執行中被取消"""
+
+_pool: Optional[ProcessPoolExecutor] = None
+_futures: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+def job_path(job_id: str) -> str:
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+        raise ValueError(f"無效的工作ID：{job_id}")
+    return os.path.join(JOB_DIR, job_id)
+
+def read_status(job_id: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(job_path(job_id), 'status.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def write_status(job_id: str, **fields) -> dict:
+    """更新工作狀態；先寫暫存檔再改名，讀取端不會看到寫到一半的內容"""
+    path = job_path(job_id)
+    status = read_status(job_id) or {'id': job_id}
+    status.update(fields, updated=time.time())
+    tmp = os.path.join(path, f'.status.{os.getpid()}.{threading.get_ident()}')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(path, 'status.json'))
+    return status
+
+def is_cancel_requested(job_id: str) -> bool:
+    return os.path.exists(os.path.join(job_path(job_id), 'cancel'))
+
+def purge_expired_jobs() -> None:
+    """刪除超過保留時間未更新的工作目錄"""
+    if not os.path.isdir(JOB_DIR):
+        return
+    cutoff = time.time() - JOB_TTL_HOURS * 3600
+    for name in os.listdir(JOB_DIR):
+        path = os.path.join(JOB_DIR, name)
+        status = os.path.join(path, 'status.json')
+        mtime = os.path.getmtime(status if os.path.exists(status) else path)
+        if mtime < cutoff and name not in _futures:
+            shutil.rmtree(path, ignore_errors=True)
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=JOB_WORKERS)
+        return _pool
+
+def discard_pool(pool: ProcessPoolExecutor) -> None:
+    """工作行程異常終止後整個行程池無法再使用，丟棄後由 get_pool 重新建立"""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def submit_to_pool(*args) -> Tuple[ProcessPoolExecutor, Future]:
+    pool = get_pool()
+    try:
+        return pool, pool.submit(*args)
+    except BrokenProcessPool:
+        discard_pool(pool)
+        pool = get_pool()
+        return pool, pool.submit(*args)
+
+def _job_finished(job_id: str, future: Future, pool: ProcessPoolExecutor) -> None:
+    with _lock:
+        _futures.pop(job_id, None)
+    if future.cancelled():
+        return
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        discard_pool(pool)
+    if error is not None:
+        status = read_status(job_id)
+        # 工作行程異常終止（如記憶體不足被砍）時狀態不會由工作本身寫入
+        if status and status.get('state') not in FINISHED_STATES:
+            write_status(job_id, state='failed', error=str(error) or type(error).__name__)
+
+def submit_job(job_type: str, inputs: Dict[str, Optional[Source]], params: dict) -> str:
+    """
+    job_type: JOB_TYPES 中的工作類型
+    inputs: 輸入檔案（路徑或上傳串流）；上傳串流會先存入工作目錄，交給工作行程讀取
+    params: 工作參數
+    return: 工作ID
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"不支援的工作類型：{job_type}")
+    purge_expired_jobs()
+    job_id = uuid.uuid4().hex
+    path = job_path(job_id)
+    os.makedirs(path)
+    paths = {}
+    for name, source in inputs.items():
+        if source is None or isinstance(source, str):
+            paths[name] = source
+            continue
+        paths[name] = os.path.join(path, f'input_{name}{file_ext(source)}')
+        with open(paths[name], 'wb') as out:
+            shutil.copyfileobj(rewind(source), out)
+    write_status(job_id, type=job_type, state='queued', progress=0.0, created=time.time())
+    try:
+        pool, future = submit_to_pool(run_job, job_id, job_type, paths, params)
+    except Exception as e:
+        write_status(job_id, state='failed', error=str(e) or type(e).__name__, finished=time.time())
+        raise
+    with _lock:
+        _futures[job_id] = future
+    future.add_done_callback(lambda f: _job_finished(job_id, f, pool))
+    return job_id
+
+def cancel_job(job_id: str) -> Optional[dict]:
+    """取消工作：排隊中的直接取消，執行中的於下次回報進度時中止"""
+    status = read_status(job_id)
+    if status is None or status.get('state') in FINISHED_STATES:
+        return status
+    open(os.path.join(job_path(job_id), 'cancel'), 'w').close()
+    with _lock:
+        future = _futures.get(job_id)
+    if future is not None and future.cancel():
+        return write_status(job_id, state='cancelled')
+    return read_status(job_id)
+
+def result_path(job_id: str) -> str:
+    return os.path.join(job_path(job_id), 'result.json')
+
+def run_job(job_id: str, job_type: str, inputs: Dict[str, Optional[str]], params: dict) -> None:
+    """在工作行程中執行，狀態、進度與結果都寫入工作目錄"""
+    if is_cancel_requested(job_id):
+        write_status(job_id, state='cancelled')
+        return
+    write_status(job_id, state='running', started=time.time())
+    last_write = [0.0]
+
+    def progress(done: float) -> None:
+        if is_cancel_requested(job_id):
+            raise JobCancelled()
+        now = time.monotonic()
+        if now - last_write[0] >= PROGRESS_INTERVAL:
+            last_write[0] = now
+            write_status(job_id, progress=round(min(max(done, 0.0), 1.0), 4))
+
+    try:
+        result = JOB_TYPES[job_type](inputs, params, progress, job_path(job_id))
+        tmp = result_path(job_id) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, default=str)
+        os.replace(tmp, result_path(job_id))
+        write_status(job_id, state='done', progress=1.0, finished=time.time())
+    except JobCancelled:
+        write_status(job_id, state='cancelled', finished=time.time())
+    except Exception as e:
+        write_status(job_id, state='failed', error=str(e), finished=time.time())
+
+def job_file_url(out_dir: str, path: str) -> str:
+    """工作目錄中的輸出檔，以 /api/jobs/<id>/files/<檔名> 提供下載"""
+    return f"/api/jobs/{os.path.basename(out_dir)}/files/{os.path.relpath(path, out_dir)}"
+
+def run_keyword_similar_merge(inputs: dict, params: dict, progress: Callable[[float], None], out_dir: str):
+    from keyword_similar_func import keyword_similar_merge
+    return keyword_similar_merge(inputs['file'], progress=progress, **params).to_dict(orient='records')
+
+def run_workcloud(inputs: dict, params: dict, progress: Callable[[float], None], out_dir: str):
+    from workcloud_func import workcloud
+    wc_path, pie_path = workcloud(inputs['file'], out_dir=out_dir, progress=progress, **params)
+    return {'wordcloud_img': job_file_url(out_dir, wc_path), 'pie_img': job_file_url(out_dir, pie_path)}
+
+def run_table_matcher(inputs: dict, params: dict, progress: Callable[[float], None], out_dir: str):
+    from tag_index_func import match_tables
+    params = dict(params)
+    tag_index_id = params.pop('tag_index_id', None)
+    result_df, unmatched_df = match_tables(inputs['main_file'], inputs.get('tag_file'), tag_index_id,
+                                           params, progress=progress)
+    return {
+        'result': result_df.to_dict(orient='records'),
+        'unmatched': unmatched_df.to_dict(orient='records')
+    }
+
+# 工作類型：函式接受 (輸入檔案, 參數, 進度回呼, 工作目錄)，回傳可序列化為 JSON 的結果
+JOB_TYPES = {
+    'keyword_similar_merge': run_keyword_similar_merge,
+    'workcloud': run_workcloud,
+    'table_matcher': run_table_matcher,
+}
@@ -1,34 +1,109 @@
 import pandas as pd
-import re
-import os
-from typing import Set, Optional
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Optional, Tuple
+from file_loader_func import Source, iter_table_chunks, load_table
 
 def normalize_keyword(kw: str) -> str:
     kw = kw.strip('[](){}、+')
     return kw.replace(" ", "").upper()
 
-def keyword_count(file_path: str, column_name: str, keywords: Set[str], output_path: Optional[str]=None) -> pd.DataFrame:
+class KeywordAutomaton:
     """
-    file_path: Excel/CSV 檔案路徑，自動判斷格式
+    Aho-Corasick 多關鍵字自動機：一次掃描文字即可找出所有出現的關鍵字
+    patterns: 已正規化的關鍵字（不可含空字串）
+    """
+    def __init__(self, patterns: Tuple[str, ...]):
+        self.patterns = patterns
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[Tuple[int, ...]] = [()]
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (pid,)
+        # BFS 建立失敗連結，並把失敗狀態的輸出併入
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        """回傳 text 中出現的關鍵字編號集合"""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+@lru_cache(maxsize=32)
+def build_keyword_automaton(patterns: Tuple[str, ...]) -> KeywordAutomaton:
+    return KeywordAutomaton(patterns)
+
+def count_keywords(texts: Iterable[str], keywords: Iterable[str]) -> Dict[str, int]:
+    """
+    texts: 已轉大寫、移除空白的文字
+    keywords: 原始關鍵字，比對前以 normalize_keyword 正規化
+    return: {關鍵字: 含該關鍵字的列數}
+    """
+    keywords = list(keywords)
+    normalized = {kw: normalize_keyword(kw) for kw in keywords}
+    patterns = tuple(sorted(set(p for p in normalized.values() if p)))
+    automaton = build_keyword_automaton(patterns)
+    pattern_counts = [0] * len(patterns)
+    total = 0
+    # 匯出資料常有大量重複內容，相同文字只掃描一次
+    for text, freq in pd.Series(texts, dtype=object).value_counts(sort=False).items():
+        total += freq
+        for pid in automaton.find(text):
+            pattern_counts[pid] += freq
+    pattern_index = {p: i for i, p in enumerate(patterns)}
+    # 空關鍵字與 str.contains('') 一致，每列皆視為命中
+    return {kw: pattern_counts[pattern_index[p]] if p else total for kw, p in normalized.items()}
+
+def keyword_count(file_path: Source, column_name: str, keywords: Set[str], output_path: Optional[str]=None, chunksize: Optional[int]=None) -> pd.DataFrame:
+    """
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
     column_name: 欲搜尋的欄位
     keywords: 關鍵字集合
     output_path: 結果CSV路徑（可選）
+    chunksize: 串流模式每塊列數（可選，設定後只讀取該欄位並逐塊累加）
     return: 統計結果DataFrame
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in ('.xls', '.xlsx'):
-        df = pd.read_excel(file_path)
-    elif ext == '.csv':
-        df = pd.read_csv(file_path)
+    if chunksize:
+        # 與 load_table 相同的工作表與 CSV 編碼判斷，結果與一次載入相同
+        chunks = (chunk[column_name] for chunk in iter_table_chunks(file_path, chunksize, usecols=[column_name]))
     else:
-        raise ValueError(f"不支援的檔案格式：{ext}")
-    
-    text_series = df[column_name].astype(str).str.upper().str.replace(" ", "")
-    counts = {kw: text_series.str.contains(kw, regex=False).sum() for kw in keywords}
+        chunks = [load_table(file_path, usecols=[column_name])[column_name]]
+
+    counts = dict.fromkeys(keywords, 0)
+    for chunk in chunks:
+        text_series = chunk.astype(str).str.upper().str.replace(" ", "")
+        for kw, cnt in count_keywords(text_series, keywords).items():
+            counts[kw] += cnt
     result_df = pd.DataFrame({
         'Keyword': list(counts.keys()),
         'Count': list(counts.values())
     }).sort_values('Count', ascending=False)
     if output_path:
         result_df.to_csv(output_path, index=False, encoding='utf-8-sig')
-    return result_df 
\ No newline at end of file
+    return result_df
@@ -1,10 +1,15 @@
 import os
 import re
+import json
+import hashlib
+import threading
+import numpy as np
 import pandas as pd
 from collections import Counter
 from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from typing import Optional, Tuple
+from file_loader_func import Source, load_table
 
 EXCLUSION_LIST = [
     "Apollo","FD","正式區","PT","PY","全模組","SSO","VN","越南新專區導入",
@@ -20,6 +25,10 @@ EXCLUSIONS = set(item.lower().strip() for item in EXCLUSION_LIST)
 # 可選中文字體
 FONT_PATH = os.path.join(os.path.dirname(__file__), 'fonts', 'NotoSansCJKtc-Regular.otf')
 
+# 輸出檔以頻率表雜湊命名，內容不變時可長期快取；超過容量上限（MB）時刪除最久未使用的檔案
+ARTIFACT_PATTERN = re.compile(r'company_(counts|wordcloud)_[0-9a-f]{16}\.(csv|png|svg)')
+ARTIFACT_DISK_MB = float(os.environ.get('KEYWORD_ARTIFACT_MB', 256))
+
 def extract_company(subject):
     segments = re.findall(r'\[([^\]]+)\]', subject)
     filtered = [s for s in (seg.strip() for seg in segments) if s.lower() not in EXCLUSIONS]
@@ -30,51 +39,146 @@ def extract_company(subject):
     else:
         return None
 
-def keyword_extraction(file_path: str, output_dir: Optional[str]=None, font_path: Optional[str]=None) -> Tuple[pd.DataFrame, str]:
+SEGMENT_PATTERN = r'\[([^\]]+)\]'
+
+def extract_companies(subjects: pd.Series) -> pd.Series:
+    """
+    extract_company 的向量化版本，結果與逐列呼叫相同
+    相同主旨只解析一次：先取唯一值，一次取出所有中括號片段並攤平成一欄，
+    排除 EXCLUSIONS 後取倒數第二個（只剩一個時取該片段），再對應回各列
+    （str.extractall 建立 MultiIndex 的成本在主旨多半不重複時比逐列呼叫還高，故用 findall + explode）
+    subjects: 主旨字串 Series
+    return: 與 subjects 相同索引的公司名稱 Series（無法判斷或空白時為 None）
+    """
+    # 空白（NaN）也視為一個唯一值，否則代碼 -1 會取到最後一個主旨的結果
+    codes, uniques = pd.factorize(subjects, use_na_sentinel=False)
+    segments = pd.Series(uniques, dtype=object).str.findall(SEGMENT_PATTERN).explode().dropna().str.strip()
+    kept = segments[~segments.str.lower().isin(EXCLUSIONS)]
+    groups = kept.groupby(level=0)
+    size = groups.transform('size')
+    pos = groups.cumcount()
+    chosen = kept[(pos == size - 2) | (size == 1)]
+    companies = np.full(len(uniques), None, dtype=object)
+    companies[chosen.index.to_numpy(dtype=np.intp)] = chosen.to_numpy()
+    return pd.Series(companies[codes], index=subjects.index, dtype=object)
+
+def artifact_hash(counts: Counter, font_path: str) -> str:
+    """頻率表與繪圖設定的雜湊，作為輸出檔名"""
+    encoded = json.dumps([sorted(counts.items()), font_path, 800, 400], ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:16]
+
+def gc_artifacts(output_dir: str) -> None:
+    """只處理符合 ARTIFACT_PATTERN 的檔案，依最後使用時間刪除至容量上限內"""
+    entries = []
+    for name in os.listdir(output_dir):
+        if ARTIFACT_PATTERN.fullmatch(name):
+            path = os.path.join(output_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), path, os.path.getsize(path)))
+            except FileNotFoundError:
+                continue
+    total = sum(size for _, _, size in entries)
+    budget = ARTIFACT_DISK_MB * 1024 * 1024
+    for _, path, size in sorted(entries):
+        if total <= budget:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def reuse_artifact(path: str) -> bool:
+    """檔案已存在時更新使用時間並回傳 True"""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def write_atomic(path: str, write) -> None:
+    # 先寫暫存檔再改名，同時處理相同頻率表的請求不會讀到寫到一半的檔案
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+# 支援的詞雲輸出格式：svg 直接由文字排版產生，不經點陣繪製與 PNG 編碼
+OUTPUT_FORMATS = ('png', 'svg')
+
+def render_wordcloud(counts: Counter, font_path: str, img_path: str, output_format: str='png') -> None:
+    try:
+        wc = WordCloud(width=800, height=400, background_color='white', font_path=font_path).generate_from_frequencies(counts)
+    except Exception as e:
+        wc = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(counts)
+    if output_format == 'svg':
+        def write_svg(tmp):
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(wc.to_svg())
+        write_atomic(img_path, write_svg)
+        return
+    # 使用獨立的 Figure 物件，不經 pyplot 全域狀態
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.imshow(wc, interpolation='bilinear')
+    ax.axis('off')
+    fig.tight_layout()
+    write_atomic(img_path, lambda tmp: fig.savefig(tmp, format='png'))
+
+def keyword_extraction(file_path: Source, output_dir: Optional[str]=None, font_path: Optional[str]=None,
+                       output_format: str='png') -> Tuple[pd.DataFrame, str]:
     """
-    file_path: Excel/CSV 檔案路徑，自動判斷格式
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
     output_dir: 輸出目錄
     font_path: 詞雲字型路徑
+    output_format: 詞雲格式 'png' 或 'svg'
     return: (公司統計DataFrame, 詞雲圖片路徑)
     """
-    if not os.path.exists(file_path):
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支援的輸出格式：{output_format}")
+    if isinstance(file_path, str) and not os.path.exists(file_path):
         raise FileNotFoundError('檔案不存在')
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in ('.xls', '.xlsx'):
-        df = pd.read_excel(file_path)
-    elif ext == '.csv':
-        df = pd.read_csv(file_path)
-    else:
-        raise ValueError(f"不支援的檔案格式：{ext}")
     # 優化：自動偵測主旨欄位
     possible_cols = ['主旨', 'subject', '主題', 'title']
+    df = load_table(file_path, usecols=lambda c: c in possible_cols)
     col = next((c for c in possible_cols if c in df.columns), None)
     if not col:
         raise ValueError(f"找不到主旨欄位，請確認欄位名稱（支援：{', '.join(possible_cols)}）")
-    df['company'] = df[col].astype(str).apply(extract_company)
-    counts = Counter(df['company'].dropna())
+    df['company'] = extract_companies(df[col].astype(str))
+    return company_wordcloud(Counter(df['company'].dropna()), output_dir, font_path, output_format)
+
+def company_wordcloud(counts: Counter, output_dir: Optional[str]=None, font_path: Optional[str]=None,
+                      output_format: str='png') -> Tuple[pd.DataFrame, str]:
+    """
+    counts: {公司: 次數} 頻率表（來自檔案或 company_store_func 的彙總）
+    output_dir: 輸出目錄
+    font_path: 詞雲字型路徑
+    output_format: 詞雲格式 'png' 或 'svg'
+    return: (公司統計DataFrame, 詞雲圖片路徑)
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支援的輸出格式：{output_format}")
     if not output_dir:
         # 強制輸出到 static 目錄
         output_dir = os.path.join(os.path.dirname(__file__), 'static')
     if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    csv_path = os.path.join(output_dir, 'company_counts.csv')
-    pd.DataFrame(counts.items(), columns=['company', 'count']).to_csv(csv_path, index=False, encoding='utf-8-sig')
-    # 詞雲
+        os.makedirs(output_dir, exist_ok=True)
     if not font_path:
         font_path = FONT_PATH
-    try:
-        wc = WordCloud(width=800, height=400, background_color='white', font_path=font_path).generate_from_frequencies(counts)
-    except Exception as e:
-        wc = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(counts)
-    img_filename = 'company_wordcloud.png'
+    digest = artifact_hash(counts, font_path)
+    result_df = pd.DataFrame(counts.items(), columns=['company', 'count'])
+    csv_path = os.path.join(output_dir, f'company_counts_{digest}.csv')
+    if not reuse_artifact(csv_path):
+        write_atomic(csv_path, lambda tmp: result_df.to_csv(tmp, index=False, encoding='utf-8-sig'))
+    # 詞雲：相同頻率表已繪製過時直接沿用
+    img_filename = f'company_wordcloud_{digest}.{output_format}'
     img_path = os.path.join(output_dir, img_filename)
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wc, interpolation='bilinear')
-    plt.axis('off')
-    plt.tight_layout()
-    plt.savefig(img_path)
-    plt.close()
+    if not reuse_artifact(img_path):
+        render_wordcloud(counts, font_path, img_path, output_format)
+        gc_artifacts(output_dir)
     # 回傳靜態路徑
     img_url = f'/static/{img_filename}'
-    return pd.DataFrame(counts.items(), columns=['company', 'count']), img_url 
\ No newline at end of file
+    return result_df, img_url
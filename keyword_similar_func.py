@@ -1,10 +1,17 @@
 import pandas as pd
 import re
-from collections import OrderedDict
-from difflib import SequenceMatcher
-from typing import Optional
+import itertools
+import math
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from similarity_func import similarity, similarity_many
+from file_loader_func import Source, load_table
+from typing import Callable, Dict, List, Optional, Set, Tuple
 import os
 
+# 每處理多少筆回報一次進度
+PROGRESS_EVERY = 1000
+
 def clean_company(raw: str) -> str:
     company = raw.split("_", 1)[0]
     company = re.sub(r"\s+", "", company)
@@ -15,40 +22,223 @@ def is_similar(a: str, b: str, threshold: float = 0.9) -> bool:
         return True
     if a.startswith(b) or b.startswith(a):
         return True
-    return SequenceMatcher(None, a, b).ratio() >= threshold
+    return similarity(a, b, threshold) >= threshold
+
+class CompanyIndex:
+    """
+    標準名稱索引，用來找出可能與新名稱相似的標準名稱
+    - 前綴樹：找出互為前綴（startswith）的名稱
+    - 字元 n-gram 倒排索引：以 prefix filtering 只索引每個名稱的前段字元，
+      共同字元數不足以達到 threshold 的名稱不會被取出
+    char_freq: 所有名稱的字元頻率，用來決定字元的全域排序（罕見字元優先）
+    """
+    def __init__(self, threshold: float, char_freq: Dict[str, int]):
+        self.threshold = threshold
+        self.char_freq = char_freq
+        self.names: Set[str] = set()
+        self.postings: Dict[Tuple[str, int], Set[str]] = defaultdict(set)
+        self.trie: dict = {}
+
+    def _tokens(self, name: str) -> List[Tuple[str, int]]:
+        # 重複字元以 (字元, 第幾次出現) 區分，使集合交集等於多重集合交集
+        seen: Dict[str, int] = defaultdict(int)
+        tokens = []
+        for ch in name:
+            tokens.append((ch, seen[ch]))
+            seen[ch] += 1
+        return sorted(tokens, key=lambda t: (self.char_freq.get(t[0], 0), t))
+
+    def _prefix_len(self, length: int) -> int:
+        # ratio = 2M/(la+lb) >= t 且長度比例限制 lb >= t*la/(2-t)，可推得 M >= t*la/(2-t)
+        # 兩名稱若共同字元數 >= o，則各自前 (長度 - o + 1) 個字元必有交集
+        t = self.threshold
+        if t > 1:
+            return 0
+        overlap = max(1, math.ceil(t * length / (2 - t) - 1e-9))
+        return max(length - overlap + 1, 0)
+
+    def add(self, name: str) -> None:
+        self.names.add(name)
+        for token in self._tokens(name)[:self._prefix_len(len(name))]:
+            self.postings[token].add(name)
+        node = self.trie
+        for ch in name:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def remove(self, name: str) -> None:
+        self.names.discard(name)
+        for token in self._tokens(name)[:self._prefix_len(len(name))]:
+            self.postings[token].discard(name)
+            if not self.postings[token]:
+                del self.postings[token]
+        path = [self.trie]
+        for ch in name:
+            path.append(path[-1][ch])
+        del path[-1]['']
+        for ch, node in zip(reversed(name), reversed(path[:-1])):
+            if path[-1]:
+                break
+            del node[ch]
+            path.pop()
+
+    def candidates(self, name: str) -> Set[str]:
+        if self.threshold <= 0:
+            return set(self.names)
+        result = set()
+        # 名稱本身的前綴
+        node = self.trie
+        if '' in node:
+            result.add('')
+        for i, ch in enumerate(name):
+            node = node.get(ch)
+            if node is None:
+                break
+            if '' in node:
+                result.add(name[:i + 1])
+        else:
+            # 以名稱為前綴的所有標準名稱
+            stack = [(node, name)]
+            while stack:
+                node, prefix = stack.pop()
+                for ch, child in node.items():
+                    if ch == '':
+                        result.add(prefix)
+                    else:
+                        stack.append((child, prefix + ch))
+        # 共同字元數可能達到 threshold 者，再以長度上限過濾
+        la = len(name)
+        for token in self._tokens(name)[:self._prefix_len(la)]:
+            for canon in self.postings.get(token, ()):
+                lb = len(canon)
+                if 2.0 * min(la, lb) / (la + lb) >= self.threshold:
+                    result.add(canon)
+        return result
 
-def merge_companies(df: pd.DataFrame, threshold: float = 0.9) -> pd.DataFrame:
+def merge_companies(df: pd.DataFrame, threshold: float = 0.9,
+                    progress: Optional[Callable[[float], None]] = None) -> pd.DataFrame:
+    """
+    依資料順序逐筆合併相似名稱
+    progress: 進度回呼，參數為 0~1 的完成比例（可選）
+    """
+    names = [clean_company(str(raw_name)) for raw_name in df["company"]]
+    char_freq = Counter(ch for name in set(names) for ch in name)
+    index = CompanyIndex(threshold, char_freq)
     merged = OrderedDict()
-    for raw_name, cnt in zip(df["company"], df["count"]):
-        name = clean_company(str(raw_name))
+    # 標準名稱在 merged 中的順序；改名時會移到最後，與 OrderedDict 行為一致
+    order: Dict[str, int] = {}
+    seq = itertools.count()
+    for i, (name, cnt) in enumerate(zip(names, df["count"])):
+        if progress and i % PROGRESS_EVERY == 0:
+            progress(i / len(names))
         placed = False
-        for canon in list(merged.keys()):
+        for canon in sorted(index.candidates(name), key=order.__getitem__):
             if is_similar(name, canon, threshold):
                 new_canon = canon if len(canon) <= len(name) else name
                 if new_canon != canon:
+                    index.remove(canon)
+                    del order[canon]
+                    # 若 new_canon 已是其他標準名稱，原位置保留並被覆蓋
+                    if new_canon not in merged:
+                        index.add(new_canon)
+                        order[new_canon] = next(seq)
                     merged[new_canon] = merged.pop(canon)
                 merged[new_canon] += int(cnt)
                 placed = True
                 break
         if not placed:
             merged[name] = int(cnt)
+            index.add(name)
+            order[name] = next(seq)
     return pd.DataFrame({"company": list(merged.keys()), "count": list(merged.values())})
 
-def keyword_similar_merge(file_path: str, output_path: Optional[str]=None, threshold: float=0.9) -> pd.DataFrame:
+def _score_pairs(args: Tuple[List[Tuple[str, str]], float]) -> List[bool]:
+    pairs, threshold = args
+    matched = []
+    # 候選配對依第二個名稱分組產生，同組共用 SequenceMatcher 的第二序列
+    for b, group in itertools.groupby(pairs, key=lambda pair: pair[1]):
+        group = [a for a, _ in group]
+        rest = [a for a in group if not (a == b or a.startswith(b) or b.startswith(a))]
+        scores = dict(zip(rest, similarity_many(rest, b, threshold)))
+        matched.extend(a not in scores or scores[a] >= threshold for a in group)
+    return matched
+
+def cluster_companies(df: pd.DataFrame, threshold: float = 0.9, workers: Optional[int] = None,
+                      shard_size: int = 5000, progress: Optional[Callable[[float], None]] = None) -> pd.DataFrame:
+    """
+    與輸入順序無關的分群合併：
+    以 CompanyIndex 產生候選配對，分批交給行程池計算相似度，再以 union-find 合併
+    每群以最短名稱（同長度取字典序最小）為代表，結果依數量遞減、名稱遞增排序
+    workers: 行程數（預設為 CPU 核心數）
+    progress: 進度回呼，依已完成的配對批次回報（可選）
+    """
+    totals: Dict[str, int] = defaultdict(int)
+    for raw_name, cnt in zip(df["company"], df["count"]):
+        totals[clean_company(str(raw_name))] += int(cnt)
+    names = sorted(totals)
+    ids = {name: i for i, name in enumerate(names)}
+    char_freq = Counter(ch for name in names for ch in name)
+    index = CompanyIndex(threshold, char_freq)
+    pairs = []
+    for name in names:
+        for canon in sorted(index.candidates(name)):
+            pairs.append((canon, name))
+        index.add(name)
+    shards = [(pairs[i:i + shard_size], threshold) for i in range(0, len(pairs), shard_size)]
+    workers = workers or os.cpu_count() or 1
+    results = []
+    if workers > 1 and len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            for matched in pool.map(_score_pairs, shards):
+                results.append(matched)
+                if progress:
+                    progress(len(results) / len(shards))
+    else:
+        for shard in shards:
+            results.append(_score_pairs(shard))
+            if progress:
+                progress(len(results) / len(shards))
+    parent = list(range(len(names)))
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    for (shard, _), matched in zip(shards, results):
+        for (a, b), ok in zip(shard, matched):
+            if ok:
+                ra, rb = find(ids[a]), find(ids[b])
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+    clusters: Dict[int, List[str]] = defaultdict(list)
+    for name in names:
+        clusters[find(ids[name])].append(name)
+    rows = []
+    for members in clusters.values():
+        canon = min(members, key=lambda n: (len(n), n))
+        rows.append((canon, sum(totals[n] for n in members)))
+    rows.sort(key=lambda r: (-r[1], r[0]))
+    return pd.DataFrame({"company": [r[0] for r in rows], "count": [r[1] for r in rows]})
+
+def keyword_similar_merge(file_path: Source, output_path: Optional[str]=None, threshold: float=0.9,
+                          mode: str="greedy", workers: Optional[int]=None,
+                          progress: Optional[Callable[[float], None]]=None) -> pd.DataFrame:
     """
-    file_path: Excel/CSV 檔案路徑，自動判斷格式
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
     output_path: 結果CSV路徑（可選）
     threshold: 相似度閾值
+    mode: greedy（依資料順序逐筆合併）或 cluster（與順序無關的平行分群）
+    workers: cluster 模式的行程數
+    progress: 進度回呼，參數為 0~1 的完成比例（可選）
     return: 合併結果DataFrame
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in ('.xls', '.xlsx'):
-        df = pd.read_excel(file_path, usecols=["company", "count"])
-    elif ext == '.csv':
-        df = pd.read_csv(file_path, usecols=["company", "count"])
+    if mode not in ("greedy", "cluster"):
+        raise ValueError(f"不支援的合併模式：{mode}")
+    df = load_table(file_path, usecols=["company", "count"])
+    if mode == "cluster":
+        result = cluster_companies(df, threshold, workers, progress=progress)
     else:
-        raise ValueError(f"不支援的檔案格式：{ext}")
-    result = merge_companies(df, threshold)
+        result = merge_companies(df, threshold, progress=progress)
     if output_path:
         result.to_csv(output_path, index=False, encoding="utf-8-sig")
     return result 
\ No newline at end of file
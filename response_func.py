@@ -0,0 +1,136 @@
+import os
+import json
+from itertools import chain
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+import pandas as pd
+from flask import Response, request
+from result_cache_func import cached_result
+
+# 串流輸出時每塊的列數
+STREAM_CHUNK_ROWS = int(os.environ.get('STREAM_CHUNK_ROWS', 10000))
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+CSV_MIMETYPE = 'text/csv'
+
+def frame_json(df: Union[pd.DataFrame, pd.Series], orient: str = 'records', **kwargs) -> str:
+    """以 pandas 的 C 編碼器逐欄序列化；NaN 輸出為 null，日期為 ISO 格式"""
+    return df.to_json(orient=orient, force_ascii=False, double_precision=15,
+                      date_format='iso', default_handler=str, **kwargs)
+
+def iter_chunks(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), STREAM_CHUNK_ROWS):
+        yield df.iloc[start:start + STREAM_CHUNK_ROWS]
+
+def iter_json_array(parts: Iterator[str]) -> Iterator[str]:
+    """把多段 JSON 陣列（如 '[1,2]'、'[3]'）串接成單一陣列"""
+    yield '['
+    first = True
+    for part in parts:
+        body = part[1:-1]
+        if not body:
+            continue
+        if not first:
+            yield ','
+        first = False
+        yield body
+    yield ']'
+
+def iter_records_json(df: pd.DataFrame) -> Iterator[str]:
+    """[{欄位: 值}, ...]，與 to_dict(orient='records') 相同的結構"""
+    return iter_json_array(frame_json(chunk) for chunk in iter_chunks(df))
+
+def iter_columns_json(df: pd.DataFrame) -> Iterator[str]:
+    """{"columns": [欄位...], "data": [[第一欄的值...], ...]}，欄位名稱只出現一次"""
+    yield '{"columns":' + json.dumps([str(c) for c in df.columns], ensure_ascii=False, separators=(',', ':')) + ',"data":['
+    for i in range(df.shape[1]):
+        if i:
+            yield ','
+        yield from iter_json_array(frame_json(chunk.iloc[:, i]) for chunk in iter_chunks(df))
+    yield ']}'
+
+def iter_ndjson(df: pd.DataFrame) -> Iterator[str]:
+    for chunk in iter_chunks(df):
+        yield frame_json(chunk, lines=True).rstrip('\n') + '\n'
+
+def iter_csv(df: pd.DataFrame) -> Iterator[str]:
+    # 加上 BOM 讓 Excel 正確辨識 UTF-8，與輸出 CSV 檔的 utf-8-sig 一致
+    yield '\ufeff' + df.iloc[:0].to_csv(index=False)
+    for chunk in iter_chunks(df):
+        yield chunk.to_csv(index=False, header=False)
+
+def iter_json(payload: Any, orient: str = 'records') -> Iterator[str]:
+    """序列化回應內容；其中的 DataFrame 以串流方式逐塊輸出"""
+    if isinstance(payload, pd.DataFrame):
+        yield from (iter_columns_json(payload) if orient == 'columns' else iter_records_json(payload))
+    elif isinstance(payload, dict):
+        yield '{'
+        for i, (key, value) in enumerate(payload.items()):
+            yield (',' if i else '') + json.dumps(str(key), ensure_ascii=False) + ':'
+            yield from iter_json(value, orient)
+        yield '}'
+    else:
+        yield json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str)
+
+def negotiate() -> Tuple[str, str]:
+    """依 Accept 標頭與 orient 查詢參數決定輸出格式，回傳 (mimetype, orient)"""
+    mimetype = request.accept_mimetypes.best_match([JSON_MIMETYPE, NDJSON_MIMETYPE, CSV_MIMETYPE],
+                                                   default=JSON_MIMETYPE)
+    orient = request.args.get('orient', 'records')
+    if orient not in ('records', 'columns'):
+        raise ValueError(f"不支援的輸出格式：{orient}")
+    return mimetype, orient
+
+def dataframe_response(payload: Any, primary: Optional[str] = None) -> Response:
+    """
+    依 Accept 標頭輸出 DataFrame 結果：
+    application/json（預設）、application/x-ndjson、text/csv 皆逐塊串流，記憶體用量不隨列數增加
+    payload: DataFrame，或含 DataFrame 的 dict
+    primary: payload 為 dict 時，NDJSON/CSV 輸出的 DataFrame 鍵名
+    查詢參數 orient=columns 時 JSON 改為欄式結構
+    """
+    mimetype, orient = negotiate()
+    if mimetype != JSON_MIMETYPE:
+        df = payload[primary] if isinstance(payload, dict) else payload
+        if mimetype == NDJSON_MIMETYPE:
+            return Response(iter_ndjson(df), mimetype=NDJSON_MIMETYPE)
+        return Response(iter_csv(df), mimetype=CSV_MIMETYPE)
+    return Response(iter_json(payload, orient), mimetype=JSON_MIMETYPE)
+
+def chunked_dataframe_response(chunks: Iterable[pd.DataFrame]) -> Response:
+    """
+    逐塊產生的結果邊計算邊輸出，不先合併成完整的 DataFrame，記憶體用量只與每塊大小有關
+    第一塊在回應前先算出，欄位錯誤等例外仍由端點回報；orient=columns 需要整欄內容，合併後再輸出
+    """
+    mimetype, orient = negotiate()
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return dataframe_response(pd.DataFrame())
+    if mimetype == JSON_MIMETYPE and orient == 'columns':
+        return dataframe_response(pd.concat([first, *chunks]))
+    frames = chain([first], chunks)
+    if mimetype == NDJSON_MIMETYPE:
+        body = (part for df in frames for part in iter_ndjson(df))
+    elif mimetype == CSV_MIMETYPE:
+        body = chain(['\ufeff' + first.iloc[:0].to_csv(index=False)],
+                     (part.to_csv(index=False, header=False) for df in frames for part in iter_chunks(df)))
+    else:
+        body = iter_json_array(frame_json(part) for df in frames for part in iter_chunks(df))
+    return Response(body, mimetype=mimetype)
+
+def cached_dataframe_response(key: str, compute: Callable[[], Any], primary: Optional[str] = None) -> Response:
+    """
+    以結果快取鍵產生 ETag（依輸出格式區分）；If-None-Match 相符時直接回傳 304，不做任何計算
+    key: result_cache_func.result_key 產生的快取鍵
+    compute: 快取未命中時計算 payload 的函式
+    """
+    mimetype, orient = negotiate()
+    etag = f"{key[:40]}-{mimetype.rsplit('/', 1)[-1]}-{orient}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = dataframe_response(cached_result(key, compute), primary)
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from types import ModuleType
+from typing import Any, Iterable, Optional, Sequence
+from file_loader_func import Source, content_hash
+
+# 結果快取：記憶體保留的筆數，磁碟目錄、容量上限（MB）與保留時間（小時）
+RESULT_CACHE_MEMORY_ITEMS = int(os.environ.get('RESULT_CACHE_MEMORY_ITEMS', 32))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result_cache'))
+RESULT_CACHE_DISK_MB = float(os.environ.get('RESULT_CACHE_DISK_MB', 512))
+RESULT_CACHE_TTL_HOURS = float(os.environ.get('RESULT_CACHE_TTL_HOURS', 24))
+
+_memory: "OrderedDict[str, Any]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
+@lru_cache(maxsize=64)
+def _file_version(path: str, mtime: float) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def code_version(modules: Iterable[ModuleType]) -> str:
+    """模組原始碼的雜湊；程式更新後舊的快取鍵自然失效"""
+    h = hashlib.sha256()
+    for module in modules:
+        path = module.__file__
+        h.update(_file_version(path, os.path.getmtime(path)).encode('ascii'))
+    return h.hexdigest()
+
+def result_key(endpoint: str, sources: Sequence[Optional[Source]], params: dict,
+               modules: Iterable[ModuleType]) -> str:
+    """
+    endpoint: 端點名稱
+    sources: 輸入檔案（路徑或上傳串流），以內容雜湊代表
+    params: 影響結果的參數（需可序列化為 JSON）
+    modules: 計算結果所用的模組，原始碼變更時快取失效
+    """
+    parts = [
+        endpoint,
+        [content_hash(s) if s is not None else None for s in sources],
+        params,
+        code_version(modules),
+    ]
+    encoded = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def _disk_path(key: str) -> str:
+    return os.path.join(RESULT_CACHE_DIR, f'{key}.pkl')
+
+def _expired(path: str) -> bool:
+    return os.path.getmtime(path) < time.time() - RESULT_CACHE_TTL_HOURS * 3600
+
+def get_result(key: str) -> Optional[Any]:
+    """依序查詢記憶體與磁碟；磁碟命中時放回記憶體"""
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            _stats['memory_hits'] += 1
+            return _memory[key]
+    path = _disk_path(key)
+    try:
+        if _expired(path):
+            os.remove(path)
+            raise FileNotFoundError(path)
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+        os.utime(path)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        _stats['misses'] += 1
+        return None
+    _stats['disk_hits'] += 1
+    _remember(key, result)
+    return result
+
+def _remember(key: str, result: Any) -> None:
+    with _lock:
+        _memory[key] = result
+        _memory.move_to_end(key)
+        while len(_memory) > RESULT_CACHE_MEMORY_ITEMS:
+            _memory.popitem(last=False)
+
+def put_result(key: str, result: Any) -> None:
+    _remember(key, result)
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    tmp = os.path.join(RESULT_CACHE_DIR, f'.{key}.{os.getpid()}.{threading.get_ident()}')
+    with open(tmp, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, _disk_path(key))
+    evict_results()
+
+def evict_results() -> None:
+    """刪除過期的快取檔，總容量超過上限時由最久未使用的開始刪除"""
+    if not os.path.isdir(RESULT_CACHE_DIR):
+        return
+    entries = []
+    for name in os.listdir(RESULT_CACHE_DIR):
+        path = os.path.join(RESULT_CACHE_DIR, name)
+        if name.startswith('.') or not name.endswith('.pkl'):
+            continue
+        try:
+            if _expired(path):
+                os.remove(path)
+                continue
+            entries.append((os.path.getmtime(path), path, os.path.getsize(path)))
+        except FileNotFoundError:
+            continue
+    total = sum(size for _, _, size in entries)
+    budget = RESULT_CACHE_DISK_MB * 1024 * 1024
+    for _, path, size in sorted(entries):
+        if total <= budget:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+def cached_result(key: str, compute) -> Any:
+    """快取命中時直接回傳，否則呼叫 compute() 並存入快取"""
+    result = get_result(key)
+    if result is None:
+        result = compute()
+        put_result(key, result)
+    return result
+
+def result_cache_stats() -> dict:
+    with _lock:
+        return dict(_stats, memory_entries=len(_memory))
+
+def clear_results() -> None:
+    with _lock:
+        _memory.clear()
+    if os.path.isdir(RESULT_CACHE_DIR):
+        for name in os.listdir(RESULT_CACHE_DIR):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(RESULT_CACHE_DIR, name))
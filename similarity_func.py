@@ -0,0 +1,115 @@
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+
+# 快取上限（筆數）
+NORMALIZE_CACHE_SIZE = 65536
+PAIR_CACHE_SIZE = 262144
+
+def normalize_text(text: str) -> str:
+    if pd.isna(text) or text is None:
+        return ""
+    text = str(text).strip().lower()
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s\u4e00-\u9fff]', '', text)
+    return text
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _cached_normalize(text: str) -> str:
+    return normalize_text(text)
+
+def cached_normalize(text) -> str:
+    """帶 LRU 快取的 normalize_text；非字串輸入（NaN 等）不進快取"""
+    if isinstance(text, str):
+        return _cached_normalize(text)
+    return normalize_text(text)
+
+class PairCache:
+    """(a, b) -> SequenceMatcher(None, a, b).ratio() 的 LRU 快取"""
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.data: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self.lock:
+            value = self.data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.data.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple[str, str], value: float) -> None:
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+_pair_cache = PairCache(PAIR_CACHE_SIZE)
+
+def _bounded_ratio(matcher: SequenceMatcher, threshold: float) -> float:
+    """依序以長度上限、real_quick_ratio、quick_ratio 提早排除，必要時才計算 ratio"""
+    bound = matcher.real_quick_ratio()
+    if bound < threshold:
+        return bound
+    bound = matcher.quick_ratio()
+    if bound < threshold:
+        return bound
+    return matcher.ratio()
+
+def similarity(a: str, b: str, threshold: float = 0.0) -> float:
+    """
+    SequenceMatcher(None, a, b).ratio()，可達到 threshold 時回傳精確值；
+    確定達不到時提早結束，回傳值只保證小於 threshold
+    """
+    cached = _pair_cache.get((a, b))
+    if cached is not None:
+        return cached
+    la, lb = len(a), len(b)
+    if la + lb and 2.0 * min(la, lb) / (la + lb) < threshold:
+        return 2.0 * min(la, lb) / (la + lb)
+    score = _bounded_ratio(SequenceMatcher(None, a, b), threshold)
+    if score >= threshold:
+        _pair_cache.put((a, b), score)
+    return score
+
+def similarity_many(candidates: Iterable[str], b: str, threshold: float = 0.0) -> List[float]:
+    """
+    批次計算 similarity(a, b, threshold)，a 取自 candidates；
+    b 為 SequenceMatcher 的第二序列，只建立一次索引（set_seq2）
+    """
+    matcher = SequenceMatcher(None)
+    matcher.set_seq2(b)
+    lb = len(b)
+    scores = []
+    for a in candidates:
+        cached = _pair_cache.get((a, b))
+        if cached is not None:
+            scores.append(cached)
+            continue
+        la = len(a)
+        if la + lb and 2.0 * min(la, lb) / (la + lb) < threshold:
+            scores.append(2.0 * min(la, lb) / (la + lb))
+            continue
+        matcher.set_seq1(a)
+        score = _bounded_ratio(matcher, threshold)
+        if score >= threshold:
+            _pair_cache.put((a, b), score)
+        scores.append(score)
+    return scores
+
+def cache_info() -> Dict[str, int]:
+    info = _cached_normalize.cache_info()
+    return {
+        'normalize_hits': info.hits, 'normalize_misses': info.misses, 'normalize_size': info.currsize,
+        'pair_hits': _pair_cache.hits, 'pair_misses': _pair_cache.misses, 'pair_size': len(_pair_cache.data),
+    }
@@ -8,27 +8,77 @@ import pandas as pd
 import re
 from collections import Counter
 import os
+from typing import Iterable, Optional, Sequence
+from file_loader_func import Source, load_table, iter_table_chunks
+
+# 中括號內的文字為標籤，如 [急件]
+TAG_PATTERN = re.compile(r'\[([^\]]+)\]')
+# 檔案模式每塊列數
+TAGCOUNT_CHUNKSIZE = int(os.environ.get('TAGCOUNT_CHUNKSIZE', 200000))
 
 def extract_tags(text):
     if pd.isna(text) or not isinstance(text, str):
         return []
-    pattern = r'\[([^\]]+)\]'
-    tags = re.findall(pattern, text)
-    return tags
+    return TAG_PATTERN.findall(text)
+
+def tag_occurrences(values: pd.Series) -> pd.DataFrame:
+    """
+    整欄一次擷取標籤（str.findall + explode），不逐列呼叫 extract_tags
+    return: 欄位 row（values 的 index）與 tag，依列與出現順序排列；非字串的值沒有標籤
+    """
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == 'empty':
+        return pd.DataFrame({'row': pd.Series(dtype='int64'), 'tag': pd.Series(dtype=object)})
+    if kind != 'string':
+        values = values.astype(object).where(values.map(lambda v: isinstance(v, str)))
+    # 沒有標籤的列 explode 後為 NaN
+    found = values.str.findall(TAG_PATTERN).explode().dropna()
+    return pd.DataFrame({'row': found.index, 'tag': found.to_numpy(dtype=object)})
+
+def rank_tags(occurrences: Iterable[pd.DataFrame], top_n: Optional[int] = None, samples: int = 0) -> pd.DataFrame:
+    """
+    occurrences: 逐塊的 tag_occurrences 結果
+    top_n: 只取前幾名（可選）
+    samples: 每個標籤保留的樣本列數（0 為不保留）
+    return: 欄位 標籤、數量（samples > 0 時加上 樣本列），依數量遞減，同數量依首次出現順序
+    """
+    counts = Counter()
+    rows = {}
+    for found in occurrences:
+        counts.update(found['tag'].tolist())
+        if samples > 0:
+            # 同一列重複出現的標籤只算一個樣本；每塊先取各標籤前 samples 列再合併
+            head = found.drop_duplicates().groupby('tag', sort=False).head(samples)
+            for tag, row in zip(head['tag'].tolist(), head['row'].tolist()):
+                kept = rows.setdefault(tag, [])
+                if len(kept) < samples:
+                    kept.append(row)
+    result = pd.DataFrame(counts.most_common(top_n), columns=['標籤', '數量'])
+    if samples > 0:
+        result['樣本列'] = [rows[tag] for tag in result['標籤']]
+    return result
+
+def count_tags(texts: Sequence, top_n: Optional[int] = None, samples: int = 0) -> pd.DataFrame:
+    """批次模式：texts 為文字陣列，樣本列為陣列位置"""
+    return rank_tags([tag_occurrences(pd.Series(list(texts), dtype=object))], top_n, samples)
+
+def tag_count(file_path: Source, column: str, top_n: Optional[int] = None, samples: int = 0,
+              chunksize: int = TAGCOUNT_CHUNKSIZE) -> pd.DataFrame:
+    """
+    檔案模式：file_path 為 Excel/CSV 檔案路徑或上傳串流，CSV 逐塊讀取
+    column: 要統計的欄位
+    return: 同 rank_tags，樣本列為資料列位置（從 0 起算，不含標題列）
+    """
+    def occurrences():
+        for chunk in iter_table_chunks(file_path, chunksize, usecols=lambda c: c == column):
+            if column not in chunk.columns:
+                raise ValueError(f"找不到欄位：{column}")
+            yield tag_occurrences(chunk[column])
+    return rank_tags(occurrences(), top_n, samples)
 
 def load_data(filename):
     try:
-        if filename.endswith(('.xlsx', '.xls')):
-            return pd.read_excel(filename)
-        elif filename.endswith('.csv'):
-            for encoding in ['utf-8', 'gbk', 'big5']:
-                try:
-                    return pd.read_csv(filename, encoding=encoding)
-                except UnicodeDecodeError:
-                    continue
-            raise Exception("無法讀取CSV文件，請檢查編碼格式")
-        else:
-            raise Exception("不支援的文件格式")
+        return load_table(filename)
     except Exception as e:
         print(f"讀取文件失敗：{e}")
         return None
@@ -54,18 +104,14 @@ def main():
         else:
             print(f"欄位 '{column}' 不存在，請重新選擇")
     print(f"正在統計欄位 '{column}' 中的標籤...")
-    all_tags = []
-    for text in df[column]:
-        tags = extract_tags(text)
-        all_tags.extend(tags)
-    if not all_tags:
+    result_df = rank_tags([tag_occurrences(df[column])])
+    if result_df.empty:
         print("沒有找到任何標籤")
         return
-    tag_counts = Counter(all_tags)
-    sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)
+    sorted_tags = list(result_df.itertuples(index=False, name=None))
     print(f"\n=== 標籤統計結果 ===")
-    print(f"共找到 {len(tag_counts)} 個不同的標籤")
-    print(f"標籤總數: {sum(tag_counts.values())}")
+    print(f"共找到 {len(result_df)} 個不同的標籤")
+    print(f"標籤總數: {result_df['數量'].sum()}")
     print("\n標籤排名:")
     print("-" * 40)
     print(f"{'標籤':<20} {'數量':<10}")
@@ -78,7 +124,6 @@ def main():
         if not output_file:
             output_file = "tag_results.csv"
         try:
-            result_df = pd.DataFrame(sorted_tags, columns=['標籤', '數量'])
             if output_file.endswith('.xlsx'):
                 result_df.to_excel(output_file, index=False)
             else:
@@ -1,24 +1,22 @@
 import pandas as pd
-import re
-from difflib import SequenceMatcher
-from collections import Counter
-from typing import List, Dict, Optional, Tuple
+import numpy as np
+import math
+from collections import Counter, defaultdict
+from typing import Callable, List, Dict, Optional, Tuple
+from scipy import sparse
 import os
-
-def normalize_text(text: str) -> str:
-    if pd.isna(text) or text is None:
-        return ""
-    text = str(text).strip().lower()
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^\w\s\u4e00-\u9fff]', '', text)
-    return text
+import json
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from file_loader_func import load_table
+from similarity_func import normalize_text, cached_normalize, similarity, similarity_many
 
 def advanced_similarity(text1: str, text2: str) -> float:
-    norm_text1 = normalize_text(text1)
-    norm_text2 = normalize_text(text2)
+    norm_text1 = cached_normalize(text1)
+    norm_text2 = cached_normalize(text2)
     if not norm_text1 or not norm_text2:
         return 0.0
-    seq_ratio = SequenceMatcher(None, norm_text1, norm_text2).ratio()
+    seq_ratio = similarity(norm_text1, norm_text2)
     return seq_ratio
 
 def is_fuzzy_match(text1: str, text2: str, threshold: float) -> Tuple[bool, float]:
@@ -26,79 +24,440 @@ def is_fuzzy_match(text1: str, text2: str, threshold: float) -> Tuple[bool, floa
     return similarity >= threshold, similarity
 
 def load_df_auto(file_path):
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in ('.xls', '.xlsx'):
-        return pd.read_excel(file_path)
-    elif ext == '.csv':
-        return pd.read_csv(file_path)
+    return load_table(file_path)
+
+# 候選被前列取走而需重取的列，一次往後合併計算的列數上限
+RESCORE_LOOKAHEAD = int(os.environ.get('TABLE_MATCHER_RESCORE_LOOKAHEAD', 256))
+
+# 字元 n-gram 範圍；包含單字元，確保有共同字元的配對都有非零分數
+NGRAM_RANGE = (1, 2)
+
+def row_values(df: pd.DataFrame, field: str) -> np.ndarray:
+    """取出欄位值，型別與 iterrows 逐列取值一致"""
+    # iterrows 會把整列轉成共同型別，例如整數欄位在全數值表格中會變成浮點數
+    row_dtype = df.iloc[:0].to_numpy().dtype
+    return df[field].to_numpy(dtype=row_dtype)
+
+def field_values(df: pd.DataFrame, field: str) -> List[str]:
+    return [str(v).strip() for v in row_values(df, field)]
+
+def normalize_all(values: List[str]) -> List[str]:
+    return [cached_normalize(v) for v in values]
+
+def char_ngrams(text: str) -> List[str]:
+    lo, hi = NGRAM_RANGE
+    return [text[i:i + n] for n in range(lo, hi + 1) for i in range(len(text) - n + 1)]
+
+class StringArray:
+    """以 UTF-8 位元組與位移量儲存的字串陣列，可直接 memory-map"""
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, strings: List[str]) -> 'StringArray':
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+class TagIndex:
+    """
+    標籤表比對索引：兩個比對欄位只正規化一次，並建立
+    - 完全相符查詢用的排序位置（正規化值, 位置）
+    - 字元 n-gram TF-IDF 稀疏矩陣
+    可用 save/load 存成 .npy 檔，載入時以 memory-map 讓多個行程共用
+    tag_df: 標籤表
+    tag_field1, tag_field2: 標籤表比對欄位
+    """
+    VERSION = 1
+
+    def __init__(self, tag_df: pd.DataFrame, tag_field1: str, tag_field2: str):
+        self.path = None
+        self.tag_df = tag_df
+        self.tag_field1 = tag_field1
+        self.tag_field2 = tag_field2
+        self.size = len(tag_df)
+        raw1 = field_values(tag_df, tag_field1)
+        raw2 = field_values(tag_df, tag_field2)
+        self.present1 = np.array([bool(v) for v in raw1], dtype=bool)
+        self.present2 = np.array([bool(v) for v in raw2], dtype=bool)
+        self.norm1 = normalize_all(raw1)
+        self.norm2 = normalize_all(raw2)
+        self.order1 = self.sorted_positions(self.norm1, self.present1)
+        self.order2 = self.sorted_positions(self.norm2, self.present2)
+        doc_freq = Counter()
+        for text in self.norm1 + self.norm2:
+            doc_freq.update(set(char_ngrams(text)))
+        self.grams = sorted(doc_freq)
+        self.vocabulary = {gram: i for i, gram in enumerate(self.grams)}
+        n_docs = 2 * self.size
+        self.idf = np.array([math.log((1 + n_docs) / (1 + doc_freq[g])) + 1 for g in self.grams],
+                            dtype=np.float32)
+        self.matrix1 = self.vectorize(self.norm1)
+        self.matrix2 = self.vectorize(self.norm2)
+
+    @staticmethod
+    def sorted_positions(norms, present) -> np.ndarray:
+        """非空值的標籤位置，依（正規化值, 位置）排序"""
+        positions = [pos for pos in range(len(norms)) if present[pos] and norms[pos]]
+        positions.sort(key=lambda pos: norms[pos])
+        return np.array(positions, dtype=np.int64)
+
+    def lookup(self, field: int, norm: str) -> np.ndarray:
+        """正規化值完全相同的標籤位置（遞增）"""
+        norms, order = (self.norm1, self.order1) if field == 1 else (self.norm2, self.order2)
+        lo = bisect_left(order, norm, key=lambda pos: norms[pos])
+        hi = bisect_right(order, norm, lo=lo, key=lambda pos: norms[pos])
+        return order[lo:hi]
+
+    def vectorize(self, texts: List[str]) -> sparse.csr_matrix:
+        """以標籤表的詞彙與 IDF 將字串轉成 L2 正規化的 TF-IDF 列向量"""
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            grams = Counter(g for g in char_ngrams(text) if g in self.vocabulary)
+            cols = [self.vocabulary[g] for g in grams]
+            vals = np.array(list(grams.values()), dtype=np.float32) * self.idf[cols]
+            norm = np.sqrt((vals * vals).sum())
+            indices.extend(cols)
+            data.extend((vals / norm).tolist() if norm else [])
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.array(data, dtype=np.float32), indices, indptr),
+                                 shape=(len(texts), len(self.vocabulary)))
+
+    def transposed(self) -> Tuple[sparse.csc_matrix, sparse.csc_matrix]:
+        """兩個比對欄位 TF-IDF 矩陣的轉置（CSC），第一次使用時計算並保留，之後的候選查詢直接共用"""
+        if getattr(self, '_transposed', None) is None:
+            self._transposed = (self.matrix1.T.tocsc(), self.matrix2.T.tocsc())
+        return self._transposed
+
+    def __reduce__(self):
+        # 已存檔的索引傳給子行程時只傳路徑，由子行程自行 memory-map
+        if self.path is not None:
+            return (TagIndex.load, (self.path,))
+        return super().__reduce__()
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.tag_df.to_pickle(os.path.join(path, 'tag_df.pkl'))
+        arrays = {
+            'present1': self.present1, 'present2': self.present2,
+            'order1': self.order1, 'order2': self.order2, 'idf': self.idf,
+        }
+        for name, strings in (('norm1', self.norm1), ('norm2', self.norm2), ('grams', self.grams)):
+            packed = strings if isinstance(strings, StringArray) else StringArray.from_list(strings)
+            arrays[f'{name}_data'] = packed.data
+            arrays[f'{name}_offsets'] = packed.offsets
+        for name, matrix in (('matrix1', self.matrix1), ('matrix2', self.matrix2)):
+            arrays[f'{name}_data'] = matrix.data
+            arrays[f'{name}_indices'] = matrix.indices
+            arrays[f'{name}_indptr'] = matrix.indptr
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), np.asarray(arr))
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'tag_field1': self.tag_field1, 'tag_field2': self.tag_field2,
+                       'size': self.size, 'vocab_size': len(self.grams)}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'TagIndex':
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['version'] != cls.VERSION:
+            raise ValueError(f"標籤索引版本不符：{meta['version']}")
+        def arr(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        index = cls.__new__(cls)
+        index.path = path
+        index.tag_df = pd.read_pickle(os.path.join(path, 'tag_df.pkl'))
+        index.tag_field1 = meta['tag_field1']
+        index.tag_field2 = meta['tag_field2']
+        index.size = meta['size']
+        index.present1, index.present2 = arr('present1'), arr('present2')
+        index.order1, index.order2 = arr('order1'), arr('order2')
+        index.idf = arr('idf')
+        index.norm1 = StringArray(arr('norm1_data'), arr('norm1_offsets'))
+        index.norm2 = StringArray(arr('norm2_data'), arr('norm2_offsets'))
+        index.grams = StringArray(arr('grams_data'), arr('grams_offsets'))
+        index.vocabulary = {index.grams[i]: i for i in range(len(index.grams))}
+        shape = (meta['size'], meta['vocab_size'])
+        index.matrix1 = sparse.csr_matrix((arr('matrix1_data'), arr('matrix1_indices'), arr('matrix1_indptr')),
+                                          shape=shape, copy=False)
+        index.matrix2 = sparse.csr_matrix((arr('matrix2_data'), arr('matrix2_indices'), arr('matrix2_indptr')),
+                                          shape=shape, copy=False)
+        return index
+
+def retrieve_candidates(main_norm1: List[str], main_norm2: List[str], index: TagIndex,
+                        top_k: int, batch_size: int = 256, exclude: Optional[np.ndarray] = None) -> List[np.ndarray]:
+    """
+    以 TF-IDF 餘弦相似度取出每列主表最相近的 top_k 個標籤位置
+    四種欄位組合取最大值，分批做稀疏矩陣乘法以限制記憶體
+    exclude: 不列入候選的標籤位置（布林陣列，可選）
+    """
+    if index.size == 0:
+        return [np.array([], dtype=int) for _ in main_norm1]
+    m1 = index.vectorize(main_norm1)
+    m2 = index.vectorize(main_norm2)
+    t1, t2 = index.transposed()
+    k = min(top_k, index.size)
+    candidates = []
+    for start in range(0, len(main_norm1), batch_size):
+        b1 = m1[start:start + batch_size]
+        b2 = m2[start:start + batch_size]
+        scores = (b1 @ t1).toarray()
+        for product in (b1 @ t2, b2 @ t1, b2 @ t2):
+            np.maximum(scores, product.toarray(), out=scores)
+        if exclude is not None:
+            scores[:, exclude] = 0
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for row, cols in zip(scores, top):
+            candidates.append(np.sort(cols[row[cols] > 0]))
+    return candidates
+
+def exact_matches(main_vals: List[Tuple[bool, str]], index: TagIndex,
+                  combo_labels: List[str]) -> List[Tuple[int, float, str]]:
+    """
+    正規化後完全相同的標籤，相似度必為 1.0，組合取第一個完全相符的欄位組合
+    return: [(標籤位置, 1.0, 組合說明)]，依位置遞增排序
+    """
+    found: Dict[int, str] = {}
+    combo = iter(combo_labels)
+    for present, main_norm in main_vals:
+        for field in (1, 2):
+            combo_desc = next(combo)
+            if present and main_norm:
+                for pos in index.lookup(field, main_norm):
+                    found.setdefault(int(pos), combo_desc)
+    return [(pos, 1.0, found[pos]) for pos in sorted(found)]
+
+def pair_similarity(norm_text1: str, norm_text2: str, threshold: float = 0.0) -> float:
+    """與 advanced_similarity 相同，但輸入已正規化；低於 threshold 時可提早結束"""
+    if not norm_text1 or not norm_text2:
+        return 0.0
+    return similarity(norm_text1, norm_text2, threshold)
+
+def score_main_row(main_vals: List[Tuple[bool, str]], candidates, index: TagIndex, combo_labels: List[str],
+                   similarity_threshold: float, min_similarity: float,
+                   scores: Optional[Dict[Tuple[str, str], float]] = None) -> List[Tuple[int, float, str]]:
+    """
+    計算一列主表對候選標籤的最佳組合相似度
+    main_vals: [(欄位1是否非空, 欄位1正規化值), (欄位2是否非空, 欄位2正規化值)]
+    scores: 已批次算好的 (主表值, 標籤值) -> 相似度（可選）
+    return: [(標籤位置, 相似度, 組合說明)]，依相似度遞減、位置遞增排序
+    """
+    scores = scores or {}
+    (present1, m1), (present2, m2) = main_vals
+    tag_fields = ((index.present1, index.norm1), (index.present2, index.norm2))
+    combos = []
+    for present, main_norm in ((present1, m1), (present2, m2)):
+        for tag_present, tag_norm in tag_fields:
+            combos.append((present, main_norm, tag_present, tag_norm))
+    records = []
+    for pos in candidates:
+        best_similarity = None
+        best_combo = ""
+        for (present, main_norm, tag_present, tag_norm), combo_desc in zip(combos, combo_labels):
+            if present and tag_present[pos]:
+                tag_val = tag_norm[pos]
+                sim = scores.get((main_norm, tag_val))
+                if sim is None:
+                    sim = pair_similarity(main_norm, tag_val, similarity_threshold)
+                if sim >= similarity_threshold and (best_similarity is None or sim > best_similarity):
+                    best_similarity, best_combo = sim, combo_desc
+        if best_similarity is not None and best_similarity >= min_similarity:
+            records.append((int(pos), best_similarity, best_combo))
+    records.sort(key=lambda r: (-r[1], r[0]))
+    return records
+
+def score_rows(index: TagIndex, main_vals: List[List[Tuple[bool, str]]], combo_labels: List[str],
+               similarity_threshold: float, min_similarity: float, max_matches: int,
+               top_k: Optional[int], force: bool = False, batch_size: int = 256,
+               progress: Optional[Callable[[float], None]] = None,
+               exclude: Optional[np.ndarray] = None) -> List[Tuple[list, Optional[list]]]:
+    """
+    計算主表列的候選紀錄；與 matched_tags 分配順序無關，可分片平行執行
+    return: 每列 (完全相符紀錄, 全部紀錄)；完全相符已足額的列不做模糊比對，全部紀錄為 None
+    force: 一律做模糊比對
+    batch_size: 每批計算的列數，限制暫存相似度的記憶體
+    progress: 進度回呼，每批完成後回報 0~1 的完成比例（可選）
+    exclude: 不列入 TF-IDF 候選的標籤位置（布林陣列，可選）
+    """
+    # 完全相符的配對相似度為 1.0，只有在門檻允許時才會入選
+    if similarity_threshold <= 1.0 and min_similarity <= 1.0:
+        exact = [exact_matches(vals, index, combo_labels) for vals in main_vals]
+    else:
+        exact = [[] for _ in main_vals]
+    fuzzy_rows = [pos for pos in range(len(main_vals)) if force or max_matches <= 0 or len(exact[pos]) < max_matches]
+    if top_k is None:
+        candidates = [range(index.size)] * len(fuzzy_rows)
     else:
-        raise ValueError(f"不支援的檔案格式：{ext}")
+        candidates = retrieve_candidates([main_vals[p][0][1] for p in fuzzy_rows],
+                                         [main_vals[p][1][1] for p in fuzzy_rows], index, top_k, exclude=exclude)
+    fuzzy = {}
+    for start in range(0, len(fuzzy_rows), batch_size):
+        batch = []
+        # 同一標籤字串的配對一起計算，標籤字串作為 SequenceMatcher 第二序列只建立一次
+        pending: Dict[str, set] = defaultdict(set)
+        for pos, cands in zip(fuzzy_rows[start:start + batch_size], candidates[start:start + batch_size]):
+            exact_pos = {r[0] for r in exact[pos]}
+            cands = [c for c in cands if c not in exact_pos]
+            batch.append((pos, cands))
+            mains = [m for present, m in main_vals[pos] if present and m]
+            for c in cands:
+                for tag_present, tag_norm in ((index.present1, index.norm1), (index.present2, index.norm2)):
+                    if tag_present[c]:
+                        tag_val = tag_norm[c]
+                        if tag_val:
+                            pending[tag_val].update(mains)
+        scores = {}
+        for tag_val, mains in pending.items():
+            mains = list(mains)
+            for main_norm, sim in zip(mains, similarity_many(mains, tag_val, similarity_threshold)):
+                scores[(main_norm, tag_val)] = sim
+        for pos, cands in batch:
+            records = score_main_row(main_vals[pos], cands, index, combo_labels,
+                                     similarity_threshold, min_similarity, scores) + exact[pos]
+            records.sort(key=lambda r: (-r[1], r[0]))
+            fuzzy[pos] = records
+        if progress:
+            progress(min(start + batch_size, len(fuzzy_rows)) / len(fuzzy_rows))
+    return [(exact[pos], fuzzy.get(pos)) for pos in range(len(main_vals))]
+
+_score_worker_state = {}
+
+def _init_score_worker(index: TagIndex, combo_labels: List[str], params: dict) -> None:
+    _score_worker_state.update(index=index, combo_labels=combo_labels, params=params)
+
+def _score_shard(main_vals: List[List[Tuple[bool, str]]]) -> List[Tuple[list, Optional[list]]]:
+    state = _score_worker_state
+    return score_rows(state['index'], main_vals, state['combo_labels'], **state['params'])
 
 def table_matcher(
     main_df: pd.DataFrame,
-    tag_df: pd.DataFrame,
+    tag_df: Optional[pd.DataFrame],
     main_field1: str,
     main_field2: str,
-    tag_field1: str,
-    tag_field2: str,
+    tag_field1: Optional[str],
+    tag_field2: Optional[str],
     tag_name_field: str,
     tag_value_field: str,
     similarity_threshold: float = 0.8,
     max_matches: int = 5,
-    min_similarity: float = 0.3
+    min_similarity: float = 0.3,
+    top_k: Optional[int] = None,
+    tag_index: Optional[TagIndex] = None,
+    workers: int = 1,
+    progress: Optional[Callable[[float], None]] = None
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    top_k: 預設 None 對所有標籤精算（與逐列比對完全相同）；設為整數時改用近似模式，
+           每列主表先以 TF-IDF 取出 top_k 個候選標籤，再以 SequenceMatcher 精算
+    tag_index: 預先建立的標籤索引（可選），提供時 tag_df 與標籤比對欄位可省略
+    workers: 平行計分的行程數；最後的標籤分配仍依序進行，結果與單行程相同
+    progress: 計分進度回呼，參數為 0~1 的完成比例（可選）
+    """
+    if tag_index is not None:
+        if (tag_field1 or tag_index.tag_field1, tag_field2 or tag_index.tag_field2) != \
+                (tag_index.tag_field1, tag_index.tag_field2):
+            raise ValueError("標籤比對欄位與標籤索引不符")
+        tag_df = tag_index.tag_df if tag_df is None else tag_df
+        tag_field1, tag_field2 = tag_index.tag_field1, tag_index.tag_field2
+        index = tag_index
+    else:
+        index = TagIndex(tag_df, tag_field1, tag_field2)
     result_df = main_df.copy()
     result_df['匹配標籤總數值'] = 0
     result_df['匹配的標籤'] = ''
     result_df['匹配相似度'] = ''
     result_df['匹配詳情'] = ''
+    main_raw1 = field_values(result_df, main_field1)
+    main_raw2 = field_values(result_df, main_field2)
+    main_norm1 = normalize_all(main_raw1)
+    main_norm2 = normalize_all(main_raw2)
+    combo_labels = [
+        f"{main_field1}↔{tag_field1}",
+        f"{main_field1}↔{tag_field2}",
+        f"{main_field2}↔{tag_field1}",
+        f"{main_field2}↔{tag_field2}"
+    ]
+    main_vals = [
+        [(bool(r1), n1), (bool(r2), n2)]
+        for r1, n1, r2, n2 in zip(main_raw1, main_norm1, main_raw2, main_norm2)
+    ]
+    params = dict(similarity_threshold=similarity_threshold, min_similarity=min_similarity,
+                  max_matches=max_matches, top_k=top_k)
+    if workers > 1 and len(main_vals) > 1:
+        shard_size = math.ceil(len(main_vals) / (workers * 4))
+        shards = [main_vals[i:i + shard_size] for i in range(0, len(main_vals), shard_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_score_worker,
+                                 initargs=(index, combo_labels, params)) as pool:
+            scored = []
+            for done, part in enumerate(pool.map(_score_shard, shards), 1):
+                scored.extend(part)
+                if progress:
+                    progress(done / len(shards))
+    else:
+        scored = score_rows(index, main_vals, combo_labels, progress=progress, **params)
+    tag_labels = tag_df.index.tolist()
+    tag_values = row_values(tag_df, tag_value_field)
+    tag_names = [str(v) for v in row_values(tag_df, tag_name_field)]
     matched_tags = set()
-    for idx, main_row in result_df.iterrows():
-        main_val1 = str(main_row[main_field1]).strip()
-        main_val2 = str(main_row[main_field2]).strip()
-        matching_records = []
-        for tag_idx, tag_row in tag_df.iterrows():
-            if tag_idx in matched_tags:
-                continue
-            tag_val1 = str(tag_row[tag_field1]).strip()
-            tag_val2 = str(tag_row[tag_field2]).strip()
-            best_similarity = 0.0
-            best_combo = ""
-            match_results = []
-            combinations = [
-                (main_val1, tag_val1, f"{main_field1}↔{tag_field1}"),
-                (main_val1, tag_val2, f"{main_field1}↔{tag_field2}"),
-                (main_val2, tag_val1, f"{main_field2}↔{tag_field1}"),
-                (main_val2, tag_val2, f"{main_field2}↔{tag_field2}")
-            ]
-            for main_val, tag_val, combo_desc in combinations:
-                if main_val and tag_val:
-                    is_match, similarity = is_fuzzy_match(main_val, tag_val, similarity_threshold)
-                    if is_match:
-                        match_results.append((combo_desc, similarity))
-            if match_results:
-                best_match = max(match_results, key=lambda x: x[1])
-                best_combo = best_match[0]
-                best_similarity = best_match[1]
-                if best_similarity >= min_similarity:
-                    matching_records.append({
-                        'index': tag_idx,
-                        'row': tag_row,
-                        'similarity': best_similarity,
-                        'combination': best_combo
-                    })
+    # 已分配標籤的布林遮罩：同名標籤共用一個代碼，分配時一併標記
+    label_codes, label_uniques = pd.factorize(pd.Index(tag_labels))
+    claimed_labels = np.zeros(len(label_uniques), dtype=bool)
+    rescored: Dict[int, List[Tuple[int, float, str]]] = {}
+
+    def unclaimed(records):
+        return [r for r in records if not claimed_labels[label_codes[r[0]]]]
+
+    def is_short(records) -> bool:
+        # 有候選已被前列取走，剩下的不足 max_matches 個
+        return len(unclaimed(records)) < min(max_matches, len(records))
+
+    def rescore(positions: List[int]) -> List[List[Tuple[int, float, str]]]:
+        # 排除已分配的標籤重新取候選並計分，多列合併為一次 score_rows
+        exclude = claimed_labels[label_codes] if top_k is not None else None
+        return [records for _, records in score_rows(index, [main_vals[p] for p in positions], combo_labels,
+                                                     force=True, exclude=exclude, **params)]
+
+    for pos, idx in enumerate(result_df.index):
+        exact_records, records = scored[pos]
+        # 依序分配：已被前面主表列取走的標籤不再參與
+        available = unclaimed(exact_records)
+        if 0 < max_matches <= len(available):
+            matching_records = available
+        else:
+            if pos in rescored:
+                records = rescored.pop(pos)
+            elif records is None:
+                # 完全相符的標籤已被前列取走，補做模糊比對
+                records = rescore([pos])[0]
+            if top_k is not None and is_short(records):
+                # 候選只取前 top_k 個且有候選已被前列取走：排除已分配的標籤重新取候選，
+                # 同 top_k=None 時一樣可配對到其餘未分配的標籤。之後同樣需要重取的列一併計算，
+                # 輪到該列時若其候選又被取走再重取一次
+                pending = [pos] + [
+                    p for p in range(pos + 1, min(pos + RESCORE_LOOKAHEAD, len(scored)))
+                    if p not in rescored and scored[p][1] is not None and is_short(scored[p][1])
+                ]
+                batch = rescore(pending)
+                rescored.update(zip(pending[1:], batch[1:]))
+                records = batch[0]
+            matching_records = unclaimed(records)
         if matching_records:
-            matching_records.sort(key=lambda x: x['similarity'], reverse=True)
             limited_records = matching_records[:max_matches]
-            newly_matched_tags = [record['index'] for record in limited_records]
-            matched_tags.update(newly_matched_tags)
-            total_value = sum(record['row'][tag_value_field] for record in limited_records)
+            matched_tags.update(tag_labels[r[0]] for r in limited_records)
+            claimed_labels[label_codes[[r[0] for r in limited_records]]] = True
+            total_value = sum(tag_values[r[0]] for r in limited_records)
             result_df.at[idx, '匹配標籤總數值'] = total_value
-            tag_names = [str(record['row'][tag_name_field]) for record in limited_records]
-            similarities = [f"{record['similarity']:.2f}" for record in limited_records]
-            combinations = [record['combination'] for record in limited_records if record['combination']]
-            result_df.at[idx, '匹配的標籤'] = ', '.join(tag_names)
-            result_df.at[idx, '匹配相似度'] = ', '.join(similarities)
+            result_df.at[idx, '匹配的標籤'] = ', '.join(tag_names[r[0]] for r in limited_records)
+            result_df.at[idx, '匹配相似度'] = ', '.join(f"{r[1]:.2f}" for r in limited_records)
+            combinations = [r[2] for r in limited_records if r[2]]
             result_df.at[idx, '匹配詳情'] = ', '.join(combinations[:3])
     unmatched_df = tag_df.drop(index=list(matched_tags)).copy()
-    return result_df, unmatched_df 
\ No newline at end of file
+    return result_df, unmatched_df
@@ -0,0 +1,116 @@
+import os
+import re
+import shutil
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+import pandas as pd
+from table_matcher_func import TagIndex, load_df_auto, table_matcher
+from file_loader_func import Source, content_hash
+
+# 標籤索引存放目錄與磁碟用量上限（MB），超過時淘汰最久未使用的索引
+TAG_INDEX_DIR = os.environ.get('TAG_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tag_indexes'))
+TAG_INDEX_DISK_MB = float(os.environ.get('TAG_INDEX_DISK_MB', 1024))
+# 每個行程保留已載入（memory-map）的索引數
+TAG_INDEX_LOADED_MAX = 8
+
+_loaded: "OrderedDict[str, TagIndex]" = OrderedDict()
+
+def tag_index_id(file_path: Source, tag_field1: str, tag_field2: str) -> str:
+    h = hashlib.sha256(content_hash(file_path).encode('ascii'))
+    h.update(f"\0{tag_field1}\0{tag_field2}\0{TagIndex.VERSION}".encode('utf-8'))
+    return h.hexdigest()[:32]
+
+def index_path(index_id: str) -> str:
+    if not re.fullmatch(r'[0-9a-f]{32}', index_id or ''):
+        raise ValueError(f"無效的標籤索引ID：{index_id}")
+    return os.path.join(TAG_INDEX_DIR, index_id)
+
+def dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def touch(path: str) -> None:
+    try:
+        os.utime(os.path.join(path, 'meta.json'))
+    except FileNotFoundError:
+        pass
+
+def evict_tag_indexes(keep: Optional[str] = None) -> None:
+    """依最後使用時間淘汰索引，直到總用量不超過 TAG_INDEX_DISK_MB"""
+    if not os.path.isdir(TAG_INDEX_DIR):
+        return
+    entries = []
+    for name in os.listdir(TAG_INDEX_DIR):
+        path = os.path.join(TAG_INDEX_DIR, name)
+        meta = os.path.join(path, 'meta.json')
+        if name.startswith('.') or not os.path.exists(meta):
+            continue
+        entries.append((os.path.getmtime(meta), name, dir_size(path)))
+    total = sum(size for _, _, size in entries)
+    budget = TAG_INDEX_DISK_MB * 1024 * 1024
+    for _, name, size in sorted(entries):
+        if total <= budget:
+            break
+        if name == keep:
+            continue
+        # 其他行程已 memory-map 的檔案在刪除後仍可繼續使用
+        shutil.rmtree(os.path.join(TAG_INDEX_DIR, name), ignore_errors=True)
+        _loaded.pop(name, None)
+        total -= size
+
+def create_tag_index(file_path: Source, tag_field1: str, tag_field2: str) -> str:
+    """
+    file_path: 標籤表 Excel/CSV 檔案路徑或上傳串流
+    tag_field1, tag_field2: 標籤表比對欄位
+    return: 標籤索引ID（同一檔案內容與欄位會得到相同ID）
+    """
+    index_id = tag_index_id(file_path, tag_field1, tag_field2)
+    path = index_path(index_id)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        touch(path)
+        return index_id
+    tag_df = load_df_auto(file_path)
+    for field in (tag_field1, tag_field2):
+        if field not in tag_df.columns:
+            raise ValueError(f"標籤表找不到欄位：{field}")
+    tmp_path = os.path.join(TAG_INDEX_DIR, f".{index_id}.{os.getpid()}.{time.time_ns()}")
+    try:
+        TagIndex(tag_df, tag_field1, tag_field2).save(tmp_path)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # 其他行程已建立同一索引
+            if not os.path.exists(os.path.join(path, 'meta.json')):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    evict_tag_indexes(keep=index_id)
+    return index_id
+
+def load_tag_index(index_id: str) -> TagIndex:
+    """載入標籤索引；陣列以 memory-map 開啟，同一行程內重複使用"""
+    path = index_path(index_id)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        _loaded.pop(index_id, None)
+        raise ValueError(f"找不到標籤索引：{index_id}")
+    touch(path)
+    if index_id in _loaded:
+        _loaded.move_to_end(index_id)
+        return _loaded[index_id]
+    index = TagIndex.load(path)
+    _loaded[index_id] = index
+    while len(_loaded) > TAG_INDEX_LOADED_MAX:
+        _loaded.popitem(last=False)
+    return index
+
+def match_tables(main_path: Source, tag_path: Optional[Source], tag_index_id: Optional[str], params: dict,
+                 progress: Optional[Callable[[float], None]] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    載入主表與標籤表（或已建立的標籤索引）後執行 table_matcher
+    params: table_matcher 的欄位與門檻參數
+    return: (匹配結果DataFrame, 未匹配標籤DataFrame)
+    """
+    tag_index = load_tag_index(tag_index_id) if tag_index_id else None
+    tag_df = None if tag_index else load_df_auto(tag_path)
+    return table_matcher(load_df_auto(main_path), tag_df, tag_index=tag_index, progress=progress, **params)
@@ -1,29 +1,11 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 import pandas as pd
-import math
 from datetime import datetime
 import os
 
-# 原有的計算邏輯
-
-def calculate_hours(start_time, end_time):
-    """計算時間差，以0.5小時為最小單位，跨日按天數計算"""
-    if start_time is None or end_time is None:
-        return None
-    try:
-        days_diff = (end_time.date() - start_time.date()).days
-        if days_diff == 0:
-            time_diff = end_time - start_time
-            hours = time_diff.total_seconds() / 3600
-            if hours < 0:
-                hours = 0.0
-        else:
-            hours = days_diff * 6.0
-        rounded_hours = math.ceil(hours * 2) / 2
-        return rounded_hours
-    except Exception as e:
-        return None
+# 計算邏輯（單筆與整欄批次）
+from calculate_hours_func import calculate_hours, calculate_hours_columns
 
 class TimeBatchCalculatorApp:
     def __init__(self, root):
@@ -107,15 +89,7 @@ class TimeBatchCalculatorApp:
             messagebox.showwarning("警告", "請選擇開始與結束時間欄位")
             return
         result_df = self.df.copy()
-        def parse_time(val):
-            try:
-                return pd.to_datetime(val)
-            except Exception:
-                return None
-        result_df['計算工時'] = [
-            calculate_hours(parse_time(row[start_col]), parse_time(row[end_col]))
-            for _, row in result_df.iterrows()
-        ]
+        result_df['計算工時'] = calculate_hours_columns(result_df[start_col], result_df[end_col])
         self.preview_data(result_df)
         self.df = result_df
 
@@ -0,0 +1,160 @@
+import os
+from datetime import time
+from typing import Iterable, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from file_loader_func import Source, iter_table_chunks
+
+# 預設時區、工作時段與工作日（np.busday_count 的 weekmask 格式）
+DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE', 'Asia/Taipei')
+WORKDAY_START = os.environ.get('WORKDAY_START', '09:00')
+WORKDAY_END = os.environ.get('WORKDAY_END', '18:00')
+WORK_WEEKMASK = os.environ.get('WORK_WEEKMASK', 'Mon Tue Wed Thu Fri')
+# 每塊列數
+TIME_CALCULATOR_CHUNKSIZE = int(os.environ.get('TIME_CALCULATOR_CHUNKSIZE', 500000))
+
+ELAPSED_COLUMN = '經過時數'
+BUSINESS_COLUMN = '工作時數'
+
+def check_timezone(name: str) -> str:
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"不支援的時區：{name}")
+    return name
+
+def parse_clock(value: str) -> int:
+    """'HH:MM' 轉為當日秒數"""
+    try:
+        t = time.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"無效的時間：{value}")
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+def to_timezone(values: pd.Series, source_tz: str = DEFAULT_TIMEZONE, target_tz: Optional[str] = None) -> pd.Series:
+    """
+    values: 時間欄位（字串或日期）
+    source_tz: 無時區資訊的值所屬的時區
+    target_tz: 轉換後的時區（預設與 source_tz 相同）
+    return: target_tz 的 tz-aware 時間欄位，無法解析為 NaT
+    整欄以時區轉換表換算，不逐列建立時區物件；夏令時間不存在的時刻往後移
+    """
+    source_tz = check_timezone(source_tz)
+    target_tz = check_timezone(target_tz or source_tz)
+    if is_datetime64_any_dtype(values):
+        parsed = values
+    else:
+        try:
+            parsed = pd.to_datetime(values, errors='coerce', format='mixed')
+        except ValueError:
+            # 不同時差的字串混在同一欄，一律換算為 UTC
+            parsed = pd.to_datetime(values, errors='coerce', format='mixed', utc=True)
+    if parsed.dt.tz is None:
+        # 重複的時刻（夏令時間結束）視為標準時間
+        parsed = parsed.dt.tz_localize(source_tz, ambiguous=np.zeros(len(parsed), dtype=bool),
+                                       nonexistent='shift_forward')
+    return parsed.dt.tz_convert(target_tz)
+
+def business_seconds(start: pd.Series, end: pd.Series, workday_start: str = WORKDAY_START,
+                     workday_end: str = WORKDAY_END, weekmask: str = WORK_WEEKMASK,
+                     holidays: Optional[Iterable[str]] = None) -> np.ndarray:
+    """
+    start, end: 同一時區的時間欄位（以牆上時間計算工作時段）
+    return: 每列落在工作日工作時段內的秒數（float，無法計算為 NaN，結束早於開始為 0）
+    工作時數 = 完整工作日數 × 每日時段長度 + 結束日已工作秒數 − 開始日已工作秒數，
+    工作日數以 np.busday_count 整欄計算
+    """
+    ws, we = parse_clock(workday_start), parse_clock(workday_end)
+    if we <= ws:
+        raise ValueError(f"工作時段結束需晚於開始：{workday_start}-{workday_end}")
+    holidays = np.array(list(holidays or []), dtype='datetime64[D]')
+    calendar = np.busdaycalendar(weekmask=weekmask, holidays=holidays)
+
+    def wall(times):
+        times = times.dt.tz_localize(None) if times.dt.tz is not None else times
+        return times.dt.as_unit('us').to_numpy()
+
+    s, e = wall(start), wall(end)
+    valid = ~(np.isnat(s) | np.isnat(e))
+    # NaT 無法交給 busday_count，先以任意日期代入再遮罩
+    s = np.where(valid, s, np.datetime64(0, 'us'))
+    e = np.where(valid, e, np.datetime64(0, 'us'))
+    # 以微秒計算
+    ws, we = ws * 10**6, we * 10**6
+    s_day, e_day = s.astype('datetime64[D]'), e.astype('datetime64[D]')
+
+    def worked(times, days):
+        # 當日已過的工作秒數；非工作日為 0
+        of_day = (times - days).astype(np.int64)
+        return np.where(np.is_busday(days, busdaycal=calendar), np.clip(of_day - ws, 0, we - ws), 0)
+
+    days = np.busday_count(s_day, e_day, busdaycal=calendar)
+    seconds = days.astype(np.int64) * (we - ws) + worked(e, e_day) - worked(s, s_day)
+    seconds[e < s] = 0
+    return np.where(valid, seconds / 1e6, np.nan)
+
+def calculate_durations(df: pd.DataFrame, start_col: str, end_col: str, source_tz: str = DEFAULT_TIMEZONE,
+                        target_tz: Optional[str] = None, workday_start: str = WORKDAY_START,
+                        workday_end: str = WORKDAY_END, weekmask: str = WORK_WEEKMASK,
+                        holidays: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    轉換開始/結束時間的時區，並加上經過時數與工作時數欄位
+    經過時數為實際經過的時間（跨夏令時間亦正確），工作時數依 target_tz 的牆上時間計算
+    """
+    missing = [c for c in (start_col, end_col) if c not in df.columns]
+    if missing:
+        raise ValueError(f"找不到欄位：{', '.join(map(str, missing))}")
+    df = df.copy()
+    start = to_timezone(df[start_col], source_tz, target_tz)
+    end = to_timezone(df[end_col], source_tz, target_tz)
+    df[start_col], df[end_col] = start, end
+    df[ELAPSED_COLUMN] = (end - start).dt.total_seconds() / 3600
+    df[BUSINESS_COLUMN] = business_seconds(start, end, workday_start, workday_end, weekmask, holidays) / 3600
+    return df
+
+def summarize(df: pd.DataFrame, group_by: Sequence[str]) -> pd.DataFrame:
+    """依人員或專案等欄位彙總筆數、經過時數與工作時數"""
+    missing = [c for c in group_by if c not in df.columns]
+    if missing:
+        raise ValueError(f"找不到欄位：{', '.join(map(str, missing))}")
+    return df.groupby(list(group_by), dropna=False).agg(
+        筆數=(BUSINESS_COLUMN, 'size'),
+        經過時數=(ELAPSED_COLUMN, 'sum'),
+        工作時數=(BUSINESS_COLUMN, 'sum'),
+    ).reset_index()
+
+def advanced_time_calculator(file_path: Source, start_col: str, end_col: str, source_tz: str = DEFAULT_TIMEZONE,
+                             target_tz: Optional[str] = None, workday_start: str = WORKDAY_START,
+                             workday_end: str = WORKDAY_END, weekmask: str = WORK_WEEKMASK,
+                             holidays: Optional[Iterable[str]] = None, group_by: Optional[Sequence[str]] = None,
+                             detail: bool = True,
+                             chunksize: int = TIME_CALCULATOR_CHUNKSIZE) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame]]:
+    """
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
+    start_col, end_col: 開始與結束時間欄位
+    source_tz: 無時區資訊的時間所屬時區；target_tz: 輸出與計算工作時段所用的時區（預設同 source_tz）
+    workday_start, workday_end: 每日工作時段（HH:MM）
+    weekmask: 工作日，如 'Mon Tue Wed Thu Fri' 或 '1111100'
+    holidays: 國定假日等非工作日（YYYY-MM-DD）
+    group_by: 彙總欄位（如人員、專案），未指定時不彙總
+    detail: 是否回傳逐列明細（只需彙總時設為 False，不保留明細以節省記憶體）
+    return: (逐列明細, 彙總結果)
+    """
+    holidays = list(holidays or [])
+    details, partials = [], []
+    for chunk in iter_table_chunks(file_path, chunksize):
+        chunk = calculate_durations(chunk, start_col, end_col, source_tz, target_tz,
+                                    workday_start, workday_end, weekmask, holidays)
+        if group_by:
+            partials.append(summarize(chunk, group_by))
+        if detail:
+            details.append(chunk)
+    summary = None
+    if group_by:
+        # 各塊的部分彙總再合併
+        summary = (pd.concat(partials).groupby(list(group_by), dropna=False, sort=True)[['筆數', '經過時數', '工作時數']]
+                   .sum().reset_index()) if partials else pd.DataFrame(columns=list(group_by) + ['筆數', '經過時數', '工作時數'])
+    result = pd.concat(details) if details else None
+    return result, summary
@@ -0,0 +1,234 @@
+import os
+import re
+import threading
+import warnings
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from pandas.tseries.api import guess_datetime_format
+from file_loader_func import Source, iter_table_chunks
+
+# 推斷格式時每欄取樣的筆數
+INFER_SAMPLE_SIZE = int(os.environ.get('TIMEFORMAT_SAMPLE_SIZE', 200))
+# 推斷結果快取的筆數
+FORMAT_CACHE_ITEMS = int(os.environ.get('TIMEFORMAT_CACHE_ITEMS', 256))
+# 自動偵測時間欄位：樣本中可依推斷格式解析的比例下限
+DETECT_MIN_RATIO = 0.8
+# 混合格式欄位最多依序嘗試的整批格式數
+MAX_FORMATS = 4
+# 每塊列數
+TIMEFORMAT_CHUNKSIZE = int(os.environ.get('TIMEFORMAT_CHUNKSIZE', 200000))
+DEFAULT_TARGET_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# guess_datetime_format 無法辨識的常見格式
+CANDIDATE_FORMATS = [
+    '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S.%f',
+    '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M', '%Y/%m/%d',
+    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+    '%m/%d/%y', '%d/%m/%y', '%Y%m%d%H%M%S', '%Y%m%d', '%Y.%m.%d', '%d.%m.%Y',
+    '%Y年%m月%d日 %H:%M:%S', '%Y年%m月%d日 %H:%M', '%Y年%m月%d日 %H時%M分', '%Y年%m月%d日',
+]
+
+_format_cache: "OrderedDict[Tuple[str, ...], Tuple[Optional[str], float]]" = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+def value_shape(value: str) -> str:
+    """數字一律視為 9，作為格式推斷快取的鍵（如 2024-01-05 與 2023-12-31 形狀相同）"""
+    return re.sub(r'\d', '9', value)
+
+def sample_values(values: pd.Series) -> List[str]:
+    """平均分散取樣非空值，避免只看到檔案開頭"""
+    values = values[values.notna()].astype(str).str.strip()
+    values = values[values != '']
+    step = max(1, len(values) // INFER_SAMPLE_SIZE)
+    return values.iloc[::step].iloc[:INFER_SAMPLE_SIZE].tolist()
+
+def parse_ratio(sample: Sequence[str], fmt: str) -> float:
+    """樣本中可依 fmt 解析的比例"""
+    if not len(sample):
+        return 0.0
+    try:
+        parsed = pd.to_datetime(pd.Series(list(sample), dtype=object), format=fmt, errors='coerce')
+    except (ValueError, TypeError):
+        return 0.0
+    return int(parsed.notna().sum()) / len(sample)
+
+def score_formats(sample: Sequence[str]) -> Tuple[Optional[str], float]:
+    """逐一以候選格式整批解析樣本，取可解析筆數最多者"""
+    with warnings.catch_warnings():
+        # guess_datetime_format 對日/月順序的提醒
+        warnings.simplefilter('ignore', UserWarning)
+        guessed = [guess_datetime_format(v) for v in sample[:20]]
+    candidates = list(dict.fromkeys([f for f in guessed if f] + CANDIDATE_FORMATS))
+    best, best_ratio = None, 0.0
+    for fmt in candidates:
+        ratio = parse_ratio(sample, fmt)
+        if ratio > best_ratio:
+            best, best_ratio = fmt, ratio
+    return best, best_ratio
+
+def infer_format(sample: Sequence[str]) -> Tuple[Optional[str], float]:
+    """
+    sample: 欄位樣本（已去除空白的字串）
+    return: (推斷的格式, 樣本可解析比例)；樣本的值形狀與先前相同時直接使用快取的結果
+    """
+    key = tuple(sorted(set(value_shape(v) for v in sample)))
+    with _lock:
+        cached = _format_cache.get(key)
+        if cached is not None:
+            _format_cache.move_to_end(key)
+    if cached is not None and cached[0]:
+        # 形狀相同但日/月順序可能不同：只用快取的格式驗證一次樣本，比例不變才沿用
+        if parse_ratio(sample, cached[0]) >= cached[1]:
+            with _lock:
+                _stats['hits'] += 1
+            return cached
+    elif cached is not None:
+        with _lock:
+            _stats['hits'] += 1
+        return cached
+    with _lock:
+        _stats['misses'] += 1
+    result = score_formats(sample)
+    with _lock:
+        _format_cache[key] = result
+        while len(_format_cache) > FORMAT_CACHE_ITEMS:
+            _format_cache.popitem(last=False)
+    return result
+
+def format_cache_stats() -> dict:
+    with _lock:
+        return dict(_stats, entries=len(_format_cache))
+
+def parse_element(value) -> Optional[pd.Timestamp]:
+    """逐一解析（每個值各自推斷格式），無法解析時回傳 None"""
+    try:
+        ts = pd.to_datetime(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return None if pd.isna(ts) else ts
+
+def convert_column(values: pd.Series, target_format: str = DEFAULT_TARGET_FORMAT,
+                   input_format: Optional[str] = None) -> Tuple[pd.Series, dict]:
+    """
+    values: 時間欄位（字串、Excel 日期或混合）
+    target_format: 輸出格式（strftime 格式）
+    input_format: 輸入格式，未指定時由樣本推斷
+    return: (轉換後的字串欄位，無法解析為 None, {'formats': 使用的輸入格式, 'fallback': 逐一解析筆數, 'failed': 無法解析筆數})
+    以推斷的明確格式整批解析；混合格式的欄位對剩下的值再推斷下一個格式，
+    最多 MAX_FORMATS 個格式後仍失敗的值才逐一推斷格式解析
+    """
+    result = np.full(len(values), None, dtype=object)
+    info = {'formats': [], 'fallback': 0, 'failed': 0}
+    if is_datetime64_any_dtype(values):
+        ok = values.notna().to_numpy()
+        result[ok] = values[ok].dt.strftime(target_format).to_numpy(dtype=object)
+        return pd.Series(result, index=values.index, dtype=object), info
+    present = values.notna().to_numpy()
+    text = values.astype(str).str.strip()
+    pending = present & (text != '').to_numpy()
+    # Excel 讀入的 datetime 物件不需解析格式
+    if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty', 'integer', 'floating', 'mixed-integer-float'):
+        is_time = values.map(lambda v: hasattr(v, 'strftime')).to_numpy(dtype=bool) & present
+        if is_time.any():
+            result[is_time] = [v.strftime(target_format) for v in values[is_time]]
+            pending &= ~is_time
+    for i in range(MAX_FORMATS):
+        idx = np.flatnonzero(pending)
+        if not len(idx):
+            break
+        subset = text.iloc[idx]
+        fmt = input_format if input_format and i == 0 else infer_format(sample_values(subset))[0]
+        if not fmt:
+            break
+        try:
+            parsed = pd.to_datetime(subset, format=fmt, errors='coerce')
+        except (ValueError, TypeError):
+            # 如時區不一致，交由逐一解析
+            break
+        ok = parsed.notna().to_numpy()
+        if not ok.any():
+            break
+        result[idx[ok]] = parsed[ok].dt.strftime(target_format).to_numpy(dtype=object)
+        pending[idx[ok]] = False
+        info['formats'].append(fmt)
+    idx = np.flatnonzero(pending)
+    if len(idx):
+        # 相同的值只解析一次
+        fallback = {}
+        subset = text.iloc[idx]
+        for value in pd.unique(subset):
+            ts = parse_element(value)
+            fallback[value] = ts.strftime(target_format) if ts is not None else None
+        converted = subset.map(fallback).to_numpy(dtype=object)
+        result[idx] = converted
+        info['fallback'] = len(idx)
+        info['failed'] = int(pd.isna(converted).sum())
+    result[pd.isna(result)] = None
+    return pd.Series(result, index=values.index, dtype=object), info
+
+def bulk_ratio(sample: Sequence[str]) -> float:
+    """樣本中可由最多 MAX_FORMATS 個推斷格式整批解析的比例（不做逐一解析）"""
+    remaining = list(sample)
+    for _ in range(MAX_FORMATS):
+        fmt = infer_format(remaining)[0] if remaining else None
+        if not fmt:
+            break
+        parsed = pd.to_datetime(pd.Series(remaining, dtype=object), format=fmt, errors='coerce')
+        remaining = [v for v, failed in zip(remaining, parsed.isna()) if failed]
+    return 1 - len(remaining) / len(sample) if len(sample) else 0.0
+
+def detect_time_columns(df: pd.DataFrame) -> List[str]:
+    """樣本多數可依同一格式解析的欄位視為時間欄位"""
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if is_datetime64_any_dtype(values):
+            columns.append(col)
+        elif (values.dtype == object or pd.api.types.is_string_dtype(values)) and bulk_ratio(sample_values(values)) >= DETECT_MIN_RATIO:
+            columns.append(col)
+    return columns
+
+def iter_timeformattransfer(file_path: Source, columns: Optional[Sequence[str]] = None,
+                            target_format: str = DEFAULT_TARGET_FORMAT,
+                            chunksize: int = TIMEFORMAT_CHUNKSIZE) -> Iterator[Tuple[pd.DataFrame, Dict[str, dict]]]:
+    """逐塊轉換，產生 (轉換後的 DataFrame, 各欄的轉換資訊)"""
+    for chunk in iter_table_chunks(file_path, chunksize):
+        if columns is None:
+            # 以第一塊偵測時間欄位，之後各塊沿用
+            columns = detect_time_columns(chunk)
+        missing = [c for c in columns if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"找不到欄位：{', '.join(map(str, missing))}")
+        chunk = chunk.copy()
+        info = {}
+        for col in columns:
+            chunk[col], info[col] = convert_column(chunk[col], target_format)
+        yield chunk, info
+
+def timeformattransfer(file_path: Source, columns: Optional[Sequence[str]] = None,
+                       target_format: str = DEFAULT_TARGET_FORMAT, output_path: Optional[str] = None,
+                       chunksize: int = TIMEFORMAT_CHUNKSIZE) -> Tuple[pd.DataFrame, Dict[str, dict]]:
+    """
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
+    columns: 要轉換的時間欄位，未指定時自動偵測
+    target_format: 輸出格式（strftime 格式）
+    output_path: 結果CSV路徑（可選，逐塊寫入）
+    chunksize: 每塊列數，CSV 逐塊讀取
+    return: (轉換後的 DataFrame, 各欄的轉換資訊：使用的輸入格式、逐一解析與無法解析的筆數)
+    """
+    chunks, summary = [], {}
+    for i, (chunk, chunk_info) in enumerate(iter_timeformattransfer(file_path, columns, target_format, chunksize)):
+        if output_path:
+            chunk.to_csv(output_path, mode='a' if i else 'w', header=not i, index=False,
+                         encoding='utf-8' if i else 'utf-8-sig')
+        chunks.append(chunk)
+        for col, info in chunk_info.items():
+            total = summary.setdefault(col, {'formats': [], 'fallback': 0, 'failed': 0})
+            total['formats'] += [f for f in info['formats'] if f not in total['formats']]
+            total['fallback'] += info['fallback']
+            total['failed'] += info['failed']
+    return (pd.concat(chunks) if chunks else pd.DataFrame()), summary
@@ -1,14 +1,22 @@
 import os
 import pandas as pd
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.colors import to_hex
 from wordcloud import WordCloud
 import matplotlib.font_manager as fm
 import numpy as np
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFilter, Image as PILImage
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 import time, random
+import tempfile
+from xml.sax.saxutils import escape
+from file_loader_func import Source, load_table
 
+@lru_cache(maxsize=8)
 def create_cloud_mask(w, h):
+    """依尺寸快取，回傳唯讀陣列"""
     img = Image.new('L', (w, h), 0)
     draw = ImageDraw.Draw(img)
     cx, cy = w//2, h//2
@@ -19,8 +27,9 @@ def create_cloud_mask(w, h):
     for dx, dy in [(-int(r*0.6), -int(r*0.8)), (int(r*0.6), -int(r*0.8))]:
         draw.ellipse([cx+dx-r2, cy+dy-r2, cx+dx+r2, cy+dy+r2], fill=255)
     mask = img.filter(ImageFilter.GaussianBlur(radius=r * 0.2))
-    arr = np.array(mask)
-    return arr > 128
+    arr = np.array(mask) > 128
+    arr.flags.writeable = False
+    return arr
 
 VIVID_COLORS = [
     '#4E79A7', '#F28E2B', '#E15759', '#76B7B2', '#59A14F', '#EDC948', '#B07AA1', '#FF9DA7', '#9C755F', '#BAB0AC'
@@ -35,7 +44,9 @@ def vivid_color_func(word, font_size, position, orientation, random_state=None,
     else:
         return random.choice(VIVID_COLORS[8:])
 
+@lru_cache(maxsize=8)
 def create_background(w, h):
+    """依尺寸快取，回傳唯讀陣列"""
     y, x = np.indices((h, w))
     dx = x - w/2; dy = y - h/2
     dist = np.sqrt(dx*dx + dy*dy)
@@ -45,40 +56,144 @@ def create_background(w, h):
     g = (250 + grad * 5).clip(0,255).astype(np.uint8)
     b = (255 - grad * 10).clip(0,255).astype(np.uint8)
     a = np.full((h, w), 255, dtype=np.uint8)
-    return np.dstack([r, g, b, a])
+    bg = np.dstack([r, g, b, a])
+    bg.flags.writeable = False
+    return bg
+
+@lru_cache(maxsize=8)
+def background_image(w, h) -> PILImage.Image:
+    """詞雲合成用的 RGBA 背景圖（唯讀使用，alpha_composite 會產生新圖）"""
+    return PILImage.fromarray(create_background(w, h)).convert('RGBA')
 
 font_list = [
     '/System/Library/Fonts/STHeiti Light.ttc',
     '/System/Library/Fonts/PingFang.ttc',
     'C:\\Windows\\Fonts\\msjh.ttc'
 ]
+@lru_cache(maxsize=1)
 def get_font_path():
     for f in font_list:
         if os.path.exists(f):
             return f
     return fm.findfont(fm.FontProperties(family=['Arial Unicode MS']))
 
-def workcloud(file_path: str, out_dir: Optional[str]=None) -> Tuple[str, str]:
+# 圓餅圖字型；直接傳給各文字物件，不修改全域 rcParams
+PIE_FONT_FAMILY = ['Arial Unicode MS', 'sans-serif']
+
+def workcloud(file_path: Source, out_dir: Optional[str]=None,
+              progress: Optional[Callable[[float], None]]=None,
+              output_format: str='png') -> Tuple[str, str]:
     """
-    file_path: Excel/CSV 檔案路徑，自動判斷格式
+    file_path: Excel/CSV 檔案路徑或上傳串流，自動判斷格式
     out_dir: 輸出目錄
+    progress: 進度回呼，各繪圖步驟完成後回報 0~1 的完成比例（可選）
+    output_format: 'png' 或 'svg'（向量圖，省去點陣合成與 PNG 編碼）
     return: (詞雲圖片路徑, 圓餅圖圖片路徑)
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext in ('.xls', '.xlsx'):
-        df = pd.read_excel(file_path)
-    elif ext == '.csv':
-        df = pd.read_csv(file_path)
-    else:
-        raise ValueError(f"不支援的檔案格式：{ext}")
+    df = load_table(file_path, usecols=lambda c: str(c).lower() in ('company', 'count'))
     df.columns = df.columns.str.lower()
     df['count'] = pd.to_numeric(df['count'], errors='coerce').fillna(0)
     df = df.groupby('company', as_index=False)['count'].sum()
     if not out_dir:
-        out_dir = os.path.join(os.path.dirname(file_path), f'output_{time.strftime("%Y%m%d_%H%M%S")}')
+        out_dir = default_out_dir(os.path.dirname(file_path) if isinstance(file_path, str) else None)
+    return render_workcloud(df, out_dir, progress, output_format)
+
+def default_out_dir(base_dir: Optional[str]=None) -> str:
+    """以時間戳命名的輸出目錄；未指定 base_dir 時放在系統暫存目錄"""
+    return os.path.join(tempfile.gettempdir() if base_dir is None else base_dir, f'output_{time.strftime("%Y%m%d_%H%M%S")}')
+
+# 支援的輸出格式：svg 直接由文字排版與扇形幾何產生向量圖，不做點陣合成與 PNG 編碼
+OUTPUT_FORMATS = ('png', 'svg')
+
+def svg_background(w, h) -> str:
+    """與 create_background 相同的放射狀漸層（中心偏白、邊緣偏藍）"""
+    r = np.sqrt((w/2)**2 + (h/2)**2)
+    return (
+        f'<defs><radialGradient id="bg" gradientUnits="userSpaceOnUse" cx="{w/2}" cy="{h/2}" r="{r:.1f}">'
+        '<stop offset="0" stop-color="rgb(255,255,245)"/><stop offset="1" stop-color="rgb(250,250,255)"/>'
+        f'</radialGradient></defs><rect width="{w}" height="{h}" fill="url(#bg)"/>'
+    )
+
+def wordcloud_svg(wc: WordCloud) -> str:
+    """詞雲排版輸出為 SVG，並在文字之前插入背景"""
+    svg = wc.to_svg()
+    head = svg.index('>') + 1
+    return svg[:head] + svg_background(wc.width, wc.height) + svg[head:]
+
+def pie_svg(pie_df: pd.DataFrame, width: int=1680, height: int=840) -> str:
+    """
+    以扇形幾何直接產生圓餅圖與明細表的 SVG，版面對應 PNG 版的 14x7 吋、左右 2:1 配置
+    扇形由 135 度起逆時針排列，與 matplotlib pie(startangle=135) 相同
+    """
+    font = ', '.join(PIE_FONT_FAMILY)
+    pie_w = width * 2 // 3
+    cx, cy = pie_w / 2, height / 2 + 20
+    r = min(pie_w, height) * 0.36
+    colors = [to_hex(c) for c in matplotlib.colormaps['tab20'](range(len(pie_df)))]
+    values = pie_df['count'].to_numpy(dtype=float)
+    total = values.sum()
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        f'<style>text{{font-family:{font};fill:#000}}</style>',
+        f'<rect width="{width}" height="{height}" fill="#fff"/>',
+        f'<text x="{cx:.1f}" y="40" font-size="16" text-anchor="middle">公司數量分布</text>',
+    ]
+
+    def point(angle, radius):
+        rad = np.radians(angle)
+        return cx + radius * np.cos(rad), cy - radius * np.sin(rad)
+
+    start = 135.0
+    for company, value, color in zip(pie_df['company'], values, colors):
+        frac = value / total if total > 0 else 0.0
+        end = start + frac * 360
+        if frac >= 1:
+            parts.append(f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="{r:.1f}" fill="{color}"/>')
+        elif frac > 0:
+            (x1, y1), (x2, y2) = point(start, r), point(end, r)
+            large = 1 if frac > 0.5 else 0
+            parts.append(f'<path d="M{cx:.1f},{cy:.1f} L{x1:.1f},{y1:.1f} A{r:.1f},{r:.1f} 0 {large} 0 {x2:.1f},{y2:.1f} Z" fill="{color}"/>')
+        mid = (start + end) / 2
+        lx, ly = point(mid, r * 1.1)
+        anchor = 'start' if np.cos(np.radians(mid)) >= 0 else 'end'
+        parts.append(f'<text x="{lx:.1f}" y="{ly:.1f}" font-size="12" text-anchor="{anchor}" dominant-baseline="middle">{escape(str(company))}</text>')
+        px, py = point(mid, r * 0.6)
+        parts.append(f'<text x="{px:.1f}" y="{py:.1f}" font-size="12" text-anchor="middle" dominant-baseline="middle">{frac * 100:.1f}%</text>')
+        start = end
+    # 明細表
+    tx, col_w, row_h = pie_w + 20, (width - pie_w - 40) / 2, 22
+    ty = cy - row_h * (len(pie_df) + 1) / 2
+    parts.append(f'<text x="{tx + col_w:.1f}" y="{ty - 12:.1f}" font-size="16" text-anchor="middle">公司明細</text>')
+    rows = [list(pie_df.columns)] + pie_df.astype(object).values.tolist()
+    for i, row in enumerate(rows):
+        y = ty + i * row_h
+        for j, cell in enumerate(row):
+            x = tx + j * col_w
+            parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{col_w:.1f}" height="{row_h}" fill="#fff" stroke="#000"/>')
+            parts.append(f'<text x="{x + col_w / 2:.1f}" y="{y + row_h / 2:.1f}" font-size="10" text-anchor="middle" dominant-baseline="middle">{escape(str(cell))}</text>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+def write_text(path: str, text: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def render_workcloud(df: pd.DataFrame, out_dir: str,
+                     progress: Optional[Callable[[float], None]]=None,
+                     output_format: str='png') -> Tuple[str, str]:
+    """
+    df: 已依公司彙總的 company、count 欄位（來自檔案或 company_store_func 的彙總）
+    out_dir: 輸出目錄
+    progress: 進度回呼（可選）
+    output_format: 'png' 或 'svg'
+    return: (詞雲圖片路徑, 圓餅圖圖片路徑)
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支援的輸出格式：{output_format}")
     os.makedirs(out_dir, exist_ok=True)
+    if progress:
+        progress(0.1)
     mask = create_cloud_mask(1200, 800)
-    bg = create_background(1200, 800)
     font_path = get_font_path()
     wc = WordCloud(
         font_path=font_path,
@@ -92,26 +207,40 @@ def workcloud(file_path: str, out_dir: Optional[str]=None) -> Tuple[str, str]:
         relative_scaling=0.5
     )
     word_cloud = wc.generate_from_frequencies(dict(zip(df['company'], df['count'])))
-    word_cloud_image = word_cloud.to_image()
-    background = PILImage.fromarray(bg)
-    result = PILImage.alpha_composite(background.convert('RGBA'), word_cloud_image)
-    wc_path = os.path.join(out_dir, 'wordcloud.png')
-    result.save(wc_path, format='PNG')
     # Pie chart
     top10 = df.nlargest(10, 'count')
     others = df.iloc[10:]['count'].sum()
     pie_df = pd.concat([top10, pd.DataFrame([{'company':'其他','count':others}])], ignore_index=True)
-    plt.rcParams['font.sans-serif'] = ['Arial Unicode MS','sans-serif']
-    fig, (ax0, ax1) = plt.subplots(1,2, figsize=(14,7), dpi=120, gridspec_kw={'width_ratios':[2,1]})
-    colors = plt.cm.tab20(range(len(pie_df)))
-    ax0.pie(pie_df['count'], labels=pie_df['company'], autopct='%1.1f%%', startangle=135, colors=colors)
-    ax0.set_title('公司數量分布')
+    if output_format == 'svg':
+        wc_path = os.path.join(out_dir, 'wordcloud.svg')
+        write_text(wc_path, wordcloud_svg(word_cloud))
+        if progress:
+            progress(0.7)
+        pie_path = os.path.join(out_dir, 'company_pie.svg')
+        write_text(pie_path, pie_svg(pie_df))
+        if progress:
+            progress(1.0)
+        return wc_path, pie_path
+    word_cloud_image = word_cloud.to_image()
+    result = PILImage.alpha_composite(background_image(1200, 800), word_cloud_image)
+    wc_path = os.path.join(out_dir, 'wordcloud.png')
+    result.save(wc_path, format='PNG')
+    if progress:
+        progress(0.7)
+    # 使用獨立的 Figure 物件，不經 pyplot 全域狀態，多執行緒可同時繪圖
+    fig = Figure(figsize=(14,7), dpi=120)
+    ax0, ax1 = fig.subplots(1,2, gridspec_kw={'width_ratios':[2,1]})
+    colors = matplotlib.colormaps['tab20'](range(len(pie_df)))
+    ax0.pie(pie_df['count'], labels=pie_df['company'], autopct='%1.1f%%', startangle=135, colors=colors,
+            textprops={'family': PIE_FONT_FAMILY})
+    ax0.set_title('公司數量分布', family=PIE_FONT_FAMILY)
     ax1.axis('off')
     tbl = ax1.table(cellText=pie_df.values, colLabels=pie_df.columns, loc='center')
     tbl.auto_set_font_size(False); tbl.set_fontsize(10)
-    for cell in tbl._cells.values(): cell.set_text_props(ha='center', va='center')
-    ax1.set_title('公司明細')
+    for cell in tbl._cells.values(): cell.set_text_props(ha='center', va='center', family=PIE_FONT_FAMILY)
+    ax1.set_title('公司明細', family=PIE_FONT_FAMILY)
     pie_path = os.path.join(out_dir, 'company_pie.png')
-    plt.tight_layout(); fig.savefig(pie_path, bbox_inches='tight', pad_inches=0)
-    plt.close(fig)
+    fig.tight_layout(); fig.savefig(pie_path, bbox_inches='tight', pad_inches=0)
+    if progress:
+        progress(1.0)
     return wc_path, pie_path 
\ No newline at end of file